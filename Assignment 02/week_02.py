@@ -1,46 +1,43 @@
+import hashlib
 import math
+import heapq
+from bisect import bisect_left
 from collections import Counter
-import re
+from itertools import accumulate
+from operator import itemgetter
 import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from ir_common import instrumentation
+from ir_common.analyzer import STRIP_PUNCTUATION, shared_analyzer
+from ir_common.batching import batch_files
+from ir_common.caching import cached_method
+from ir_common.ranking import top_k
 
 document_titles = {}
 
 # Step 1: Define the documents
-# Function to add documents from a directory
-def add_documents_from_directory(directory_path):
-    """Add all text files from a directory to the documents list."""
-    documents = []  # List to hold the contents of documents
-    for file_name in os.listdir(directory_path):
-        if file_name.endswith(".txt"):  # Process only .txt files
-            file_path = os.path.join(directory_path, file_name)
-            with open(file_path, 'r', encoding='utf-8') as file:
-                title = os.path.splitext(os.path.basename(file_path))[0]  # Extract title from file name
-                content = file.read()
-                doc_id = hash(file_path)  # Use a hash of the file path as a unique ID
-                document_titles[doc_id] = title  # Store the title with doc_id
-                documents.append(content)
-    return documents
-
-# documents list with the documents loaded from a directory
+# The .txt files of directory_path are read by load_index below (in parallel for large
+# folders) when get_engine is first called, so importing this module does no indexing work
 directory_path = "./Documents_02"
-documents = add_documents_from_directory(directory_path)
 
 # Step 2: Preprocess the documents
 # Stopword list
 # stopwords = set(["the", "is", "in", "and", "to", "a", "of", "on", "with", "it", "for", "as", "by", "an", "can", "from"])
 
-def preprocess(text):
-     # Remove punctuation using regex
-    text = re.sub(r'[^\w\s]', '', text)  # Retain only words and spaces
+# Precompiled punctuation removal, lowercasing and splitting, applied chunk by chunk
+ANALYZER = shared_analyzer(STRIP_PUNCTUATION)
 
-    # Lowercase, split into words, and remove stopwords
-    words = text.lower().split()
-    return words
+def preprocess(text):
+    # Remove punctuation, lowercase and split into words, chunk by chunk
+    words = ANALYZER.iter_tokens(text)
+    return list(words)
     # return [word for word in words if word not in stopwords]
 
-# Tokenized documents
-tokenized_docs = [preprocess(doc) for doc in documents]
-
 # Step 3: Calculate term frequency (TF)
 def compute_tf(doc_tokens):
     tf = Counter(doc_tokens)
@@ -50,13 +47,12 @@ def compute_tf(doc_tokens):
 
 # Step 4: Calculate inverse document frequency (IDF)
 def compute_idf(tokenized_docs):
-    num_docs = len(tokenized_docs)
-    idf = {}
-    all_terms = set(term for doc in tokenized_docs for term in doc)
-    for term in all_terms:
-        doc_count = sum(1 for doc in tokenized_docs if term in doc)
-        idf[term] = math.log(num_docs / (doc_count)) # remove 1
-    return idf
+    # Count document frequencies in a single pass over the documents
+    doc_freqs = Counter(term for doc in tokenized_docs for term in set(doc))
+    return compute_idf_from_df(doc_freqs, len(tokenized_docs))
+
+def compute_idf_from_df(doc_freqs, num_docs):
+    return {term: math.log(num_docs / doc_count) for term, doc_count in doc_freqs.items()} # remove 1
 
 # Step 5: Compute TF-IDF for each document
 def compute_tfidf(tf, idf):
@@ -65,34 +61,579 @@ def compute_tfidf(tf, idf):
         tfidf[term] = tf_value * idf.get(term, 0)
     return tfidf
 
-# Precompute TF and IDF
-idfs = compute_idf(tokenized_docs)
-tfidf_docs = [compute_tfidf(compute_tf(doc), idfs) for doc in tokenized_docs]
+# Step 6: Rank documents based on a user query
+class TfidfSearchEngine:
+    """Cosine-similarity search over postings, with document norms computed on first use.
 
-# print(tfidf_docs)
+    Documents can be added and removed incrementally. Postings hold raw term frequencies
+    under stable document IDs and are updated in place, as are the document frequencies.
+    The IDFs are refreshed before the next query, and norms and score bounds are then
+    recomputed lazily, so rankings always match a full rebuild over the same documents.
 
-# Step 6: Rank documents based on a user query
-def rank_documents(query):
-    query_tokens = preprocess(query)
-    query_tf = compute_tf(query_tokens)
-    query_tfidf = compute_tfidf(query_tf, idfs)
-
-    # Compute cosine similarity for ranking
-    rankings = []
-    for i, doc_tfidf in enumerate(tfidf_docs):
-        dot_product = sum(query_tfidf.get(term, 0) * doc_tfidf.get(term, 0) for term in query_tfidf)
+    Rankings are cached per normalized query (its token multiset) and k in an LRU cache of
+    cache_size entries. Adding or removing a document bumps the index version, which is
+    part of every cache key, so earlier results are never served again.
+    """
+
+    def __init__(self, tokenized_docs=(), titles=(), cache_size=1024):
+        self.titles = []  # Document index -> title
+        self.doc_tfs = []  # Document index -> term frequencies
+        self.doc_ids = []  # Document index -> stable document ID, ascending
+        self.doc_freqs = Counter()
+        # Postings: term -> [(document ID, term frequency), ...] in document order
+        self.postings = {}
+        self.idfs = {}
+        self.doc_matrix = None
+        self.version = 0
+        self.cache_size = cache_size
+        self._next_doc_id = 0
+        self._doc_tfs_by_id = {}
+        self._doc_norms = {}  # Document ID -> norm, filled on first use
+        self._term_upper_bounds = {}  # Term -> bound, filled on first use
+        self._changed_terms = set()  # Terms whose DF changed since the last refresh
+        self._num_docs = 0  # Document count the IDFs were computed for
+        self._init_cache()
+        for tokens, title in zip(tokenized_docs, titles):
+            self.add_document(title, tokens)
+        self.refresh()
+
+    def _init_cache(self):
+        self._cached_ranking = cached_method(self._ranking, self.cache_size)
+
+    def cache_info(self):
+        """Hit/miss counters and size of the query result cache."""
+        return self._cached_ranking.cache_info()
+
+    def _index_changed(self, terms):
+        # Cached rankings are keyed by version, so older entries are never hit again and age out
+        self._changed_terms.update(terms)
+        self._stale = True
+        self.doc_matrix = None
+        self.version += 1
+
+    def _append(self, title, tf):
+        doc_id = self._next_doc_id
+        self._next_doc_id += 1
+        self.titles.append(title)
+        self.doc_tfs.append(tf)
+        self.doc_ids.append(doc_id)
+        self._doc_tfs_by_id[doc_id] = tf
+        for term, tf_value in tf.items():
+            self.postings.setdefault(term, []).append((doc_id, tf_value))
+
+    def add_document(self, title, tokens):
+        """Add a preprocessed document, returning its index."""
+        tf = compute_tf(tokens)
+        self._append(title, tf)
+        self.doc_freqs.update(tf.keys())
+        self._index_changed(tf.keys())
+        return len(self.titles) - 1
+
+    def merge_partial(self, titles, doc_tfs, doc_freqs):
+        """Append a partial index built by _index_file_batch: per-document TFs and their DFs."""
+        for title, tf in zip(titles, doc_tfs):
+            self._append(title, tf)
+        self.doc_freqs.update(doc_freqs)
+        self._index_changed(doc_freqs.keys())
+
+    def remove_document(self, doc_index):
+        """Remove a document; later documents shift down by one index, as in a rebuild."""
+        doc_id = self.doc_ids.pop(doc_index)
+        tf = self.doc_tfs.pop(doc_index)
+        del self.titles[doc_index]
+        del self._doc_tfs_by_id[doc_id]
+        self._doc_norms.pop(doc_id, None)
+        for term in tf:
+            term_postings = self.postings[term]
+            del term_postings[bisect_left(term_postings, doc_id, key=itemgetter(0))]
+            if not term_postings:
+                del self.postings[term]
+        self.doc_freqs.subtract(tf.keys())
+        for term in tf:
+            if not self.doc_freqs[term]:
+                del self.doc_freqs[term]
+        self._index_changed(tf.keys())
+
+    def refresh(self):
+        """Bring the IDFs up to date and drop the norms and score bounds they invalidate.
+
+        Every IDF depends on the number of documents, so when that changed all of them are
+        recomputed and every norm and bound is dropped. Otherwise (a document replaced by
+        another) only the terms whose DF changed are, with the documents containing them.
+        """
+        num_docs = len(self.doc_tfs)
+        if num_docs != self._num_docs:
+            self.idfs = compute_idf_from_df(self.doc_freqs, num_docs)
+            self._doc_norms.clear()
+            self._term_upper_bounds.clear()
+            self._num_docs = num_docs
+        else:
+            for term in self._changed_terms:
+                self._term_upper_bounds.pop(term, None)
+                if term not in self.doc_freqs:
+                    self.idfs.pop(term, None)
+                    continue
+                self.idfs[term] = math.log(num_docs / self.doc_freqs[term])
+                for doc_id, _ in self.postings[term]:
+                    if self._doc_norms.pop(doc_id, None) is not None:
+                        for doc_term in self._doc_tfs_by_id[doc_id]:
+                            self._term_upper_bounds.pop(doc_term, None)
+        self._changed_terms = set()
+        self._stale = False
+
+    @property
+    def tfidf_docs(self):
+        """Document index -> TF-IDF weights, computed from the current IDFs."""
+        if self._stale:
+            self.refresh()
+        return [compute_tfidf(tf, self.idfs) for tf in self.doc_tfs]
+
+    def _doc_norm(self, doc_id):
+        norm = self._doc_norms.get(doc_id)
+        if norm is None:
+            norm = math.sqrt(sum((tf_value * self.idfs.get(term, 0)) ** 2
+                                 for term, tf_value in self._doc_tfs_by_id[doc_id].items()))
+            self._doc_norms[doc_id] = norm
+        return norm
+
+    def _term_upper_bound(self, term):
+        # Largest length-normalized weight of a term, used to bound its score contribution
+        bound = self._term_upper_bounds.get(term)
+        if bound is None:
+            idf = self.idfs[term]
+            bound = max(tf_value * idf / self._doc_norm(doc_id) for doc_id, tf_value in self.postings[term])
+            self._term_upper_bounds[term] = bound
+        return bound
+
+    def _doc_index(self, doc_id):
+        return bisect_left(self.doc_ids, doc_id)
+
+    def rank(self, query, k=None):
+        """Return the top k (all if k is None) (document index, similarity) pairs with a positive score."""
+        with instrumentation.stage("tokenize"):
+            # Queries repeat, so their analysis is cached
+            query_key = _query_key(ANALYZER.analyze(query))
+        return list(self._cached_ranking(self.version, query_key, k, False))
+
+    def rank_maxscore(self, query, k=10):
+        """Top-k ranking with MaxScore dynamic pruning; returns exactly what rank(query, k) does."""
+        with instrumentation.stage("tokenize"):
+            # Queries repeat, so their analysis is cached
+            query_key = _query_key(ANALYZER.analyze(query))
+        return list(self._cached_ranking(self.version, query_key, k, True))
+
+    def _ranking(self, version, query_key, k, pruning):
+        """Uncached ranking of a normalized query; version is only there to key the cache."""
+        if self._stale:
+            self.refresh()
+        query_tokens = [term for term, count in query_key for _ in range(count)]
+        query_tfidf = compute_tfidf(compute_tf(query_tokens), self.idfs)
         query_norm = math.sqrt(sum(value ** 2 for value in query_tfidf.values()))
-        doc_norm = math.sqrt(sum(value ** 2 for value in doc_tfidf.values()))
-        similarity = dot_product / (query_norm * doc_norm) if query_norm and doc_norm else 0
-    
-        rankings.append((i, similarity))
-    
-    # Sort by similarity score in descending order
-    rankings.sort(key=lambda x: x[1], reverse=True)
-    return rankings
+        if not query_norm:
+            return ()
+        if pruning and k is not None:
+            # MaxScore interleaves scoring and top-k selection
+            with instrumentation.stage("score"):
+                return tuple(self._rank_maxscore(query_tfidf, query_norm, k))
+        return tuple(self._rank_exhaustive(query_tfidf, query_norm, k))
+
+    def _rank_exhaustive(self, query_tfidf, query_norm, k):
+        # Term-at-a-time: only documents sharing a query term get an accumulator
+        with instrumentation.stage("score"):
+            dot_products = {}
+            for term, query_weight in query_tfidf.items():
+                if not query_weight:
+                    continue
+                idf = self.idfs[term]
+                for doc_id, tf_value in self.postings[term]:
+                    dot_products[doc_id] = dot_products.get(doc_id, 0) + query_weight * (tf_value * idf)
+            scores = [(doc_id, dot_product / (query_norm * self._doc_norm(doc_id)))
+                      for doc_id, dot_product in dot_products.items() if dot_product]
+        instrumentation.count("candidates", len(scores))
+
+        # Highest similarity first, ties broken by document order
+        with instrumentation.stage("sort"):
+            if k is None:
+                ranked = sorted(scores, key=lambda x: (-x[1], x[0]))
+            else:
+                ranked = heapq.nsmallest(k, scores, key=lambda x: (-x[1], x[0]))
+        return [(self._doc_index(doc_id), score) for doc_id, score in ranked]
+
+    def _rank_maxscore(self, query_tfidf, query_norm, k):
+        """MaxScore: documents are visited in document order. Terms are split into "essential" terms,
+        which can still lift a document into the top k on their own, and non-essential ones, which
+        are only probed for candidates whose score bound still beats the current k-th best score.
+        """
+        if k <= 0:
+            return []
+
+        terms = [term for term, weight in query_tfidf.items() if weight and term in self.postings]
+        bounds = {term: query_tfidf[term] / query_norm * self._term_upper_bound(term) for term in terms}
+        terms.sort(key=bounds.get)
+        cumulative_bounds = list(accumulate(bounds[term] for term in terms))
+        cursors = {term: 0 for term in terms}
+
+        top_k = []  # Min-heap of (similarity, -document ID)
+        threshold = 0.0
+        first_essential = 0
+        while first_essential < len(terms):
+            essential_docs = [self.postings[term][cursors[term]][0] for term in terms[first_essential:]
+                              if cursors[term] < len(self.postings[term])]
+            if not essential_docs:
+                break
+            candidate = min(essential_docs)
+            doc_norm = self._doc_norm(candidate)
+
+            doc_weights = {}
+            estimate = 0.0
+            for term in terms[first_essential:]:
+                cursor = cursors[term]
+                if cursor < len(self.postings[term]) and self.postings[term][cursor][0] == candidate:
+                    doc_weights[term] = self.postings[term][cursor][1] * self.idfs[term]
+                    estimate += query_tfidf[term] * doc_weights[term] / (query_norm * doc_norm)
+                    cursors[term] = cursor + 1
+
+            # Probe non-essential terms, largest bound first, while the candidate can still win
+            pruned = False
+            for j in range(first_essential - 1, -1, -1):
+                if _cannot_beat(estimate + cumulative_bounds[j], threshold):
+                    pruned = True
+                    break
+                term = terms[j]
+                term_postings = self.postings[term]
+                cursor = bisect_left(term_postings, candidate, lo=cursors[term], key=itemgetter(0))
+                cursors[term] = cursor
+                if cursor < len(term_postings) and term_postings[cursor][0] == candidate:
+                    doc_weights[term] = term_postings[cursor][1] * self.idfs[term]
+                    estimate += query_tfidf[term] * doc_weights[term] / (query_norm * doc_norm)
+            if pruned:
+                continue
+
+            # Exact score, accumulated in the same order as rank() so results are bit-identical
+            dot_product = 0
+            for term, query_weight in query_tfidf.items():
+                if term in doc_weights:
+                    dot_product += query_weight * doc_weights[term]
+            if not dot_product:
+                continue
+            entry = (dot_product / (query_norm * doc_norm), -candidate)
+            if len(top_k) < k:
+                heapq.heappush(top_k, entry)
+            elif entry > top_k[0]:
+                heapq.heapreplace(top_k, entry)
+            if len(top_k) == k:
+                threshold = top_k[0][0]
+                while first_essential < len(terms) and _cannot_beat(cumulative_bounds[first_essential], threshold):
+                    first_essential += 1
+
+        return [(self._doc_index(-negative_id), score) for score, negative_id in sorted(top_k, reverse=True)]
+
+    def build_matrix(self):
+        """Store the documents as an L2-normalized CSR matrix over a fixed vocabulary."""
+        if self._stale:
+            self.refresh()
+        self.vocabulary = {term: column for column, term in enumerate(sorted(term for term in self.postings
+                                                                              if self.idfs[term]))}
+        indptr = [0]
+        indices = []
+        data = []
+        for doc_id, tf in zip(self.doc_ids, self.doc_tfs):
+            for term, tf_value in tf.items():
+                weight = tf_value * self.idfs[term]
+                if weight:
+                    indices.append(self.vocabulary[term])
+                    data.append(weight / self._doc_norm(doc_id))
+            indptr.append(len(indices))
+        self.doc_matrix = csr_matrix((np.array(data, dtype=np.float64), np.array(indices, dtype=np.int64),
+                                      np.array(indptr, dtype=np.int64)),
+                                     shape=(len(self.doc_tfs), len(self.vocabulary)))
+
+    def rank_batch(self, queries, k=10, batch_size=10000):
+        """Rank many queries with sparse matrix products, returning a top-k list per query.
+
+        Queries are scored batch_size at a time to bound the size of the score matrix.
+        """
+        if self._stale:
+            self.refresh()
+        if self.doc_matrix is None:
+            self.build_matrix()
+        results = []
+        for start in range(0, len(queries), batch_size):
+            query_matrix = self._query_matrix(queries[start:start + batch_size])
+            scores = (query_matrix @ self.doc_matrix.T).tocsr()
+            for row in range(scores.shape[0]):
+                doc_indices = scores.indices[scores.indptr[row]:scores.indptr[row + 1]]
+                row_scores = scores.data[scores.indptr[row]:scores.indptr[row + 1]]
+                positive = row_scores > 0
+                # Highest similarity first, ties broken by document index
+                results.append(top_k(row_scores[positive], k, doc_indices[positive]))
+        return results
+
+    def _query_matrix(self, queries):
+        """L2-normalized TF-IDF rows for a list of queries."""
+        indptr = [0]
+        indices = []
+        data = []
+        for query in queries:
+            query_tfidf = compute_tfidf(compute_tf(ANALYZER.analyze(query)), self.idfs)
+            query_norm = math.sqrt(sum(value ** 2 for value in query_tfidf.values()))
+            for term, weight in query_tfidf.items():
+                if term in self.vocabulary and weight:
+                    indices.append(self.vocabulary[term])
+                    data.append(weight / query_norm)
+            indptr.append(len(indices))
+        return csr_matrix((np.array(data, dtype=np.float64), np.array(indices, dtype=np.int64),
+                           np.array(indptr, dtype=np.int64)),
+                          shape=(len(queries), len(self.vocabulary)))
+
+    def to_snapshot(self):
+        """Plain-data copy of the engine state, refreshed, for pickling.
+
+        The cache and the CSR matrix are left out; rank_batch rebuilds the matrix on demand.
+        """
+        if self._stale:
+            self.refresh()
+        state = dict(self.__dict__)
+        del state["_cached_ranking"]
+        state["doc_matrix"] = None
+        state.pop("vocabulary", None)
+        return state
+
+    @classmethod
+    def from_snapshot(cls, state):
+        """Rebuild an engine from to_snapshot() output without recomputing anything."""
+        engine = cls.__new__(cls)
+        engine.__dict__.update(state)
+        engine._init_cache()
+        return engine
+
+def _query_key(tokens):
+    """Normalize query tokens to their sorted multiset, so word order does not split the cache."""
+    return tuple(sorted(Counter(tokens).items()))
+
+def _cannot_beat(score_bound, threshold):
+    """True if a document bounded by score_bound cannot displace the current k-th score.
+
+    Later documents lose ties, so a bound equal to the threshold is enough to prune; the
+    slack covers rounding differences between the bound and the exact score.
+    """
+    return score_bound * (1 + 1e-9) <= threshold
+
+# Precompute TF and IDF, reusing a snapshot of the index when the documents have not changed
+SNAPSHOT_VERSION = 4
+
+# Snapshots are kept in a per-user cache directory, out of the folders they index
+SNAPSHOT_DIRECTORY = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                                  "tfidf_search")
+
+# Fewer new files than this are indexed in-process; starting a pool would cost more
+PARALLEL_MIN_FILES = 64
+
+def default_snapshot_path(directory_path):
+    """The snapshot file of a documents directory, named after the directory's absolute path."""
+    key = hashlib.sha256(os.path.abspath(directory_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(SNAPSHOT_DIRECTORY, f"index_{key}.pkl")
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    """Unpickler for snapshots, which hold only builtin containers and Counters.
+
+    Any other class or function named in the file is refused rather than imported, so a
+    planted snapshot cannot run code.
+    """
+
+    def find_class(self, module, name):
+        if (module, name) == ("collections", "Counter"):
+            return Counter
+        raise pickle.UnpicklingError(f"index snapshot refers to {module}.{name}")
+
+def _read_snapshot(snapshot_path):
+    """The snapshot saved at snapshot_path, or None if it is missing, invalid or outdated."""
+    try:
+        with open(snapshot_path, 'rb') as file:
+            snapshot = _SnapshotUnpickler(file).load()
+    except Exception:  # Missing, unreadable or damaged in any of many ways: rebuild it
+        return None
+    if (not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION
+            or set(snapshot) != {"version", "fingerprint", "file_paths", "documents", "engine"}
+            or not isinstance(snapshot["engine"], dict)
+            or set(snapshot["engine"]) != set(TfidfSearchEngine().to_snapshot())):
+        return None
+    return snapshot
+
+def fingerprint_directory(directory_path):
+    """Map each .txt file in a directory to its (size, mtime) so changes can be detected."""
+    fingerprint = {}
+    for file_name in os.listdir(directory_path):
+        if file_name.endswith(".txt"):
+            file_path = os.path.join(directory_path, file_name)
+            stat = os.stat(file_path)
+            fingerprint[file_path] = (stat.st_size, stat.st_mtime_ns)
+    return fingerprint
+
+def load_index(directory_path, snapshot_path=None, workers=1, progress=None, max_worker_memory=None):
+    """Return (engine, documents, file_paths) for a directory, reusing a saved snapshot.
+
+    Only files that are new or whose size or mtime changed are read and preprocessed;
+    removed files are dropped from the index. An updated snapshot is written back, by
+    default to default_snapshot_path(directory_path) in SNAPSHOT_DIRECTORY.
+
+    With workers > 1 and at least PARALLEL_MIN_FILES files to index, the files are split
+    into batches that a process pool turns into partial indexes (per-document TFs and the
+    batch's DFs), merged in file order so the result is the same as a serial build.
+    progress(files_done, files_total) is called as batches finish, and max_worker_memory
+    (bytes) bounds the size of each worker's batch.
+    """
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers!r}")
+    snapshot_path = snapshot_path or default_snapshot_path(directory_path)
+    fingerprint = fingerprint_directory(directory_path)
+
+    snapshot = _read_snapshot(snapshot_path)
+    if snapshot is None:
+        snapshot = {"version": SNAPSHOT_VERSION, "fingerprint": {}, "file_paths": [], "documents": [],
+                    "engine": TfidfSearchEngine().to_snapshot()}
+
+    engine = TfidfSearchEngine.from_snapshot(snapshot["engine"])
+    file_paths = snapshot["file_paths"]
+    documents = snapshot["documents"]
+    if snapshot["fingerprint"] == fingerprint:
+        return engine, documents, file_paths
+
+    # Drop removed and changed files (highest index first so indices stay valid)...
+    for i in reversed(range(len(file_paths))):
+        if fingerprint.get(file_paths[i]) != snapshot["fingerprint"][file_paths[i]]:
+            engine.remove_document(i)
+            del file_paths[i]
+            del documents[i]
+    # ...then index new and changed files
+    indexed = set(file_paths)
+    new_paths = [file_path for file_path in fingerprint if file_path not in indexed]
+    if workers == 1 or len(new_paths) < PARALLEL_MIN_FILES:
+        partials = map(_index_file_batch, [new_paths] if new_paths else [])
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        partials = executor.map(_index_file_batch, batch_files(new_paths, workers, max_worker_memory))
+    try:
+        for batch_paths, titles, contents, doc_tfs, doc_freqs in partials:
+            engine.merge_partial(titles, doc_tfs, doc_freqs)
+            file_paths.extend(batch_paths)
+            documents.extend(contents)
+            if progress:
+                progress(len(file_paths) - len(indexed), len(new_paths))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    # The CSR matrix is left for the first batch query to build
+    snapshot.update(fingerprint=fingerprint, file_paths=file_paths, documents=documents,
+                    engine=engine.to_snapshot())
+    os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+    temporary_path = snapshot_path + ".tmp"
+    with open(temporary_path, 'wb') as file:
+        pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, snapshot_path)
+    return engine, documents, file_paths
+
+def _index_file_batch(file_paths):
+    """Worker: read and preprocess a batch of files into a partial index.
+
+    Returns (file_paths, titles, contents, doc_tfs, doc_freqs), doc_freqs counting the
+    documents of this batch only.
+    """
+    titles = []
+    contents = []
+    doc_tfs = []
+    doc_freqs = Counter()
+    for file_path in file_paths:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+        tf = compute_tf(preprocess(content))
+        titles.append(os.path.splitext(os.path.basename(file_path))[0])
+        contents.append(content)
+        doc_tfs.append(tf)
+        doc_freqs.update(tf.keys())
+    return file_paths, titles, contents, doc_tfs, doc_freqs
+
+_engine = None
+_documents = None
+_file_paths = None  # Document index -> file path, None for documents added without one
+
+def get_engine(workers=1):
+    """Return the search engine, loading the index on first use.
+
+    workers > 1 lets that first load index a large folder with a process pool.
+    """
+    global _engine, _documents, _file_paths
+    if _engine is None:
+        _engine, _documents, _file_paths = load_index(directory_path, workers=workers)
+        for file_path, title in zip(_file_paths, _engine.titles):
+            document_titles[hash(file_path)] = title
+    return _engine
+
+def _invalidate_snapshot():
+    # The snapshot mirrors the files in directory_path; once the index is edited in memory
+    # it no longer does, so the next load_index rebuilds it from the files
+    try:
+        os.remove(default_snapshot_path(directory_path))
+    except FileNotFoundError:
+        pass
+
+def __getattr__(name):
+    """Load the index on first access to the module-level names it used to build at import."""
+    if name == "engine":
+        return get_engine()
+    if name == "documents":
+        get_engine()
+        return _documents
+    if name == "tokenized_docs":
+        get_engine()
+        return [preprocess(doc) for doc in _documents]
+    if name in ("idfs", "tfidf_docs"):
+        engine = get_engine()
+        if engine._stale:
+            engine.refresh()
+        return getattr(engine, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# print(tfidf_docs)
+
+def rank_documents(query, k=None, pruning=False):
+    """Rank documents for a query, returning the top k (index, similarity) pairs.
+
+    With pruning=True (and a k), MaxScore skips documents that cannot reach the top k.
+    """
+    if pruning and k is not None:
+        return get_engine().rank_maxscore(query, k)
+    return get_engine().rank(query, k)
+
+def rank_documents_batch(queries, k=10):
+    """Rank a batch of queries with one sparse matrix product per chunk of queries."""
+    return get_engine().rank_batch(queries, k)
+
+def add_document(title, content, file_path=None):
+    """Index a new document incrementally, returning its index.
+
+    document_titles keys it by hash(file_path), or by hash(title) when there is no path.
+    """
+    engine = get_engine()
+    _documents.append(content)
+    _file_paths.append(file_path)
+    document_titles[hash(title if file_path is None else file_path)] = title
+    _invalidate_snapshot()
+    return engine.add_document(title, preprocess(content))
+
+def remove_document(doc_index):
+    """Remove a document by index; weights are refreshed before the next query."""
+    engine = get_engine()
+    file_path = _file_paths.pop(doc_index)
+    document_titles.pop(hash(engine.titles[doc_index] if file_path is None else file_path), None)
+    del _documents[doc_index]
+    _invalidate_snapshot()
+    engine.remove_document(doc_index)
 
 # Step 7: Create a simple CLI
-def main():
+def main(workers=1):
+    get_engine(workers)
     print("Welcome to the TF-IDF Search Engine!")
     print("Enter your query to find the most relevant documents.")
     
@@ -108,14 +649,13 @@ def main():
         for rank, (doc_index, score) in enumerate(rankings, start=1):
             if score > 0:
                 retried = True
-                # Retrieve the document title using the doc_id (using the index in the rankings list)
-                doc_id = list(document_titles.keys())[doc_index]
-                document_title = document_titles[doc_id]
+                document_title = get_engine().titles[doc_index]
                 print(f"{rank}. {document_title} (Score: {score :.4f}) & (Relevency: {score * 100:.2f}%)")
                 # print(f"   {documents[doc_index][:100]}{'...' if len(documents[doc_index]) > 100 else ''}")
         
         if not retried:
             print("\nSorry, no relevant documents found for your query. Please try again with different terms.")
 # Run the CLI
+# (python week_02.py 8 indexes the documents with 8 worker processes)
 if __name__ == "__main__":
-    main()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1)
@@ -1,4 +1,7 @@
+import json
 import os
+import sys
+from collections import deque
 
 # Step 1: Choose an Application
 # I choose an e-book as the application to implement the Hypertext Model. The e-book will have chapters and sections as nodes, allowing the user to navigate between them.
@@ -31,9 +34,46 @@ chapters = {
 }
 
 
+def load_chapters(path):
+    """Read chapters from a JSON file mapping chapter numbers to their title, content and links."""
+    with open(path, encoding="utf-8") as file:
+        book = {int(chapter_id): chapter for chapter_id, chapter in json.load(file).items()}
+    for chapter_id, chapter in book.items():
+        for link in chapter["links"]:
+            if link not in book:
+                raise ValueError(f"Chapter {chapter_id} links to missing chapter {link}.")
+    return book
+
+
 # Step 3: Create Links
 # Links are created by specifying the available nodes users can navigate to.
 
+def shortest_link_path(source, target):
+    """
+    Chapters along a shortest chain of links from source to target, or None if none leads
+    there, found with a breadth-first search that stops as soon as it reaches target.
+    """
+    came_from = {source: None}
+    queue = deque([source])
+    while queue and target not in came_from:
+        chapter_id = queue.popleft()
+        for link in chapters[chapter_id]["links"]:
+            if link not in came_from:
+                came_from[link] = chapter_id
+                queue.append(link)
+    if target not in came_from:
+        return None
+    path = [target]
+    while came_from[path[-1]] is not None:
+        path.append(came_from[path[-1]])
+    return path[::-1]
+
+
+def use_chapters(book):
+    """Navigate book instead of the built-in chapters."""
+    global chapters
+    chapters = book
+
 
 # Step 4: Design User Interface
 # The user interface is a simple command-line interaction. Users input commands to navigate between chapters. If they want to go back, they can type 'B'.
@@ -55,6 +95,7 @@ def display_chapter(chapter_id, previous_chapter=None):
     # If there's a previous chapter, offer a back option
     if previous_chapter:
         print("Type B to go back to the previous chapter")
+    print("Type G to jump to any chapter along the shortest chain of links")
 
     # Get user input for the next chapter to navigate to
     while True:
@@ -63,6 +104,14 @@ def display_chapter(chapter_id, previous_chapter=None):
             return int(choice)
         elif choice == 'B' and previous_chapter:
             return previous_chapter
+        elif choice == 'G':
+            target = input("Enter the chapter number: ").strip()
+            path = shortest_link_path(chapter_id, int(target)) if target.isdigit() and int(target) in chapters else None
+            if path is None:
+                print("No chain of links leads to that chapter.")
+                continue
+            print(" -> ".join(chapters[step]['title'] for step in path))
+            return path[-1]
         else:
             print("Invalid choice. Please try again.")
 
@@ -93,4 +142,7 @@ def start_reading():
 
 # Step 8: Test and Debug
 if __name__ == "__main__":
+    # Optionally read the chapters from a JSON file given on the command line
+    if len(sys.argv) > 1:
+        use_chapters(load_chapters(sys.argv[1]))
     start_reading()
@@ -1,46 +1,184 @@
+import asyncio
+import heapq
 import math
+import os
 import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from itertools import islice
+
+from ir_common import instrumentation
+from ir_common.analyzer import SPLIT, shared_analyzer
+from ir_common.caching import cached_method
+
+# Trie key marking the end of a phrase; token IDs are never negative
+_PHRASE_END = -1
+
+# Lowercasing and whitespace splitting shared by every assistant; short texts such as
+# queries and knowledge base phrases are analysed once and served from its cache
+ANALYZER = shared_analyzer(SPLIT)
 
 class VoiceAssistantNN:
-    def __init__(self):
+    def __init__(self, documents=None, cache_size=1024, semantic_knowledge=None,
+                 expansion_depth=2, expansion_decay=0.5, expansion_cache_size=4096):
         # Semantic knowledge base for synonyms and related terms
-        self.semantic_knowledge = {
-            'benefits': ['advantages', 'positive effects', 'gains'],
-            'exercise': ['workouts', 'physical activity', 'training', 'fitness'],
-            'health': ['wellness', 'well-being', 'fitness', 'vitality'],
-            'workout': ['exercise', 'training', 'physical activity'],
-            'wellness': ['health', 'well-being', 'fitness']
-        }
+        if semantic_knowledge is None:
+            semantic_knowledge = {
+                'benefits': ['advantages', 'positive effects', 'gains'],
+                'exercise': ['workouts', 'physical activity', 'training', 'fitness'],
+                'health': ['wellness', 'well-being', 'fitness', 'vitality'],
+                'workout': ['exercise', 'training', 'physical activity'],
+                'wellness': ['health', 'well-being', 'fitness']
+            }
+        self.semantic_knowledge = semantic_knowledge
+
+        # Related terms are followed for up to expansion_depth hops; a term reached
+        # after n hops is weighted expansion_decay ** (n - 1), so direct synonyms
+        # count as much as the query's own tokens and only farther terms decay
+        self.expansion_depth = expansion_depth
+        self.expansion_decay = expansion_decay
+        self._compile_semantic_knowledge()
+        # Expanded queries are memoized; the expansion of each entry is precomputed
+        self._cached_expansion = cached_method(self._expand_tokens, expansion_cache_size)
 
         # Simulated document corpus (in a real-world scenario, this would be a large database)
-        self.document_corpus = [
-            "Regular exercise provides numerous benefits for physical and mental health",
-            "Workouts can improve cardiovascular wellness and overall fitness",
-            "Physical activity is crucial for maintaining good health and preventing diseases",
-            "Benefits of consistent training include increased energy and reduced stress",
-            "Wellness programs emphasize the importance of regular exercise and healthy lifestyle"
-        ]
+        if documents is None:
+            documents = [
+                "Regular exercise provides numerous benefits for physical and mental health",
+                "Workouts can improve cardiovascular wellness and overall fitness",
+                "Physical activity is crucial for maintaining good health and preventing diseases",
+                "Benefits of consistent training include increased energy and reduced stress",
+                "Wellness programs emphasize the importance of regular exercise and healthy lifestyle"
+            ]
+        self.document_corpus = list(documents)
+
+        # Corpus index: token counts per document and token-level document frequencies,
+        # kept up to date on add/remove; normalized vectors and postings are rebuilt lazily
+        self.doc_term_counts = [Counter(ANALYZER.iter_tokens(doc)) for doc in self.document_corpus]
+        self.doc_freqs = Counter()
+        for term_counts in self.doc_term_counts:
+            self.doc_freqs.update(term_counts.keys())
+        self.inverted_index = {}
+        self._index_stale = True
+
+        # Ranked results are cached per (index version, expanded token multiset, k); adding or
+        # removing a document bumps the version so earlier entries are never served again
+        self.index_version = 0
+        self._cached_search = cached_method(self._search, cache_size)
+
+    @classmethod
+    def from_corpus_file(cls, path, encoding="utf-8", **options):
+        """
+        Create an assistant over a corpus file holding one document
+        per line; blank lines are skipped
+        """
+        with open(path, encoding=encoding) as file:
+            documents = [line.strip() for line in file if line.strip()]
+        return cls(documents, **options)
 
     def preprocess_text(self, query):
         """
         Preprocess the input text by converting to lowercase 
         and splitting into tokens
         """
-        return query.lower().split()
+        with instrumentation.stage("tokenize"):
+            return list(ANALYZER.analyze(query))
+
+    def _compile_semantic_knowledge(self):
+        """
+        Compile the knowledge base into a trie over token IDs, so single
+        and multi-word entries are matched in one pass over a query,
+        with the transitive expansion of every entry worked out up front
+        """
+        # Token IDs come from the vocabulary shared by the analyzers of this process
+        self._token_vocabulary = ANALYZER.vocabulary
+        self._phrase_ids = {}
+        self._phrases = []
+        self._related_phrases = {}
+        self._phrase_trie = {}
+
+        for phrase, related_terms in self.semantic_knowledge.items():
+            phrase_id = self._intern_phrase(phrase)
+            related = self._related_phrases.setdefault(phrase_id, [])
+            related.extend(self._intern_phrase(term) for term in related_terms)
+
+            node = self._phrase_trie
+            for token_id in self._phrases[phrase_id]:
+                node = node.setdefault(token_id, {})
+            node[_PHRASE_END] = phrase_id
+
+        # Related phrases are all known now, so every entry's expansion can be computed
+        self._phrase_expansions = {phrase_id: self._expand_phrase(phrase_id)
+                                   for phrase_id in self._related_phrases}
+
+    def _intern_phrase(self, phrase):
+        token_ids = tuple(map(self._token_vocabulary.intern, self.preprocess_text(phrase)))
+        if token_ids not in self._phrase_ids:
+            self._phrase_ids[token_ids] = len(self._phrases)
+            self._phrases.append(token_ids)
+        return self._phrase_ids[token_ids]
+
+    def _expand_phrase(self, phrase_id):
+        """
+        Tokens related to a knowledge base entry within expansion_depth
+        hops, each with the weight of its shortest path
+        """
+        hops = {phrase_id: 0}
+        frontier = [phrase_id]
+        for hop in range(1, self.expansion_depth + 1):
+            next_frontier = []
+            for current in frontier:
+                for related in self._related_phrases.get(current, ()):
+                    if related not in hops:
+                        hops[related] = hop
+                        next_frontier.append(related)
+            frontier = next_frontier
+
+        weights = {}
+        for related, hop in hops.items():
+            if hop == 0:
+                continue
+            weight = self.expansion_decay ** (hop - 1)
+            for token_id in self._phrases[related]:
+                token = self._token_vocabulary.terms[token_id]
+                weights[token] = max(weights.get(token, 0), weight)
+        return tuple(weights.items())
 
     def semantic_understanding(self, tokens):
         """
         Understand the semantic meaning of tokens by expanding 
         with related terms and synonyms
         """
-        expanded_tokens = []
-        for token in tokens:
-            expanded_tokens.append(token)
-            # Add synonyms and related terms from semantic knowledge
-            if token in self.semantic_knowledge:
-                expanded_tokens.extend(self.semantic_knowledge[token])
+        return list(self.semantic_expansion(tokens))  # Each token once, query tokens first
+
+    def semantic_expansion(self, tokens):
+        """
+        Expand tokens like semantic_understanding, returning token -> weight
+        with terms two or more hops away down-weighted
+        """
+        with instrumentation.stage("expand"):
+            return dict(self._cached_expansion(tuple(tokens)))
+
+    def _expand_tokens(self, tokens):
+        # Query tokens keep weight 1; each is listed once. Returns (token, weight) pairs.
+        expanded_tokens = dict.fromkeys(tokens, 1.0)
+
+        token_ids = [self._token_vocabulary.get(token) for token in tokens]
+        for start in range(len(token_ids)):
+            # Every knowledge base entry starting here, multi-word ones included
+            node = self._phrase_trie
+            for token_id in token_ids[start:]:
+                node = node.get(token_id)
+                if node is None:
+                    break
+                if _PHRASE_END in node:
+                    # Add synonyms and related terms from semantic knowledge
+                    for token, weight in self._phrase_expansions[node[_PHRASE_END]]:
+                        if weight > expanded_tokens.get(token, 0):
+                            expanded_tokens[token] = weight
         
-        return list(set(expanded_tokens))  # Remove duplicates
+        return tuple(expanded_tokens.items())
 
     def calculate_cosine_similarity(self, query_vector, doc_vector):
         """
@@ -60,45 +198,102 @@ class VoiceAssistantNN:
         
         return dot_product / (query_magnitude * doc_magnitude)
 
-    def tf_idf_vectorization(self, tokens, corpus):
+    def inverse_document_frequency(self, token):
+        """
+        IDF of a token from the number of corpus documents containing it
+        """
+        return math.log(len(self.document_corpus) / (self.doc_freqs[token] + 1)) + 1
+
+    def tf_idf_vectorization(self, tokens):
         """
         Create TF-IDF vector representation for tokens
         """
         # Term Frequency (TF)
-        tf = {}
-        for token in tokens:
-            tf[token] = tf.get(token, 0) + 1
-        
-        # Inverse Document Frequency (IDF)
-        idf = {}
-        total_docs = len(corpus)
+        tf = Counter(tokens)
         
-        for token in set(tokens):
-            doc_count = sum(1 for doc in corpus if token in doc.lower())
-            idf[token] = math.log(total_docs / (doc_count + 1)) + 1
-        
-        # TF-IDF Calculation
-        tfidf_vector = {token: tf.get(token, 0) * idf.get(token, 0) for token in set(tokens)}
+        # TF-IDF Calculation with document frequencies from the corpus index
+        tfidf_vector = {token: count * self.inverse_document_frequency(token) for token, count in tf.items()}
         return tfidf_vector
 
-    def search_and_retrieve(self, expanded_query):
+    def _build_index(self):
         """
-        Search and retrieve most relevant documents
+        Store every document as a unit-length TF-IDF vector in an
+        inverted index of token -> [(document index, weight)]
         """
-        query_vector = self.tf_idf_vectorization(expanded_query, self.document_corpus)
-        
-        # Rank documents by cosine similarity
-        document_scores = []
-        for doc in self.document_corpus:
-            doc_tokens = self.preprocess_text(doc)
-            doc_vector = self.tf_idf_vectorization(doc_tokens, self.document_corpus)
+        self.inverted_index = {}
+        for doc_index, term_counts in enumerate(self.doc_term_counts):
+            doc_vector = self.tf_idf_vectorization(term_counts.elements())
+            doc_magnitude = math.sqrt(sum(val**2 for val in doc_vector.values()))
+            if doc_magnitude == 0:
+                continue
+            for token, weight in doc_vector.items():
+                self.inverted_index.setdefault(token, []).append((doc_index, weight / doc_magnitude))
+        self._index_stale = False
+
+    def search_and_retrieve(self, expanded_query, k=None):
+        """
+        Search and retrieve most relevant documents, reusing cached
+        rankings for queries with the same expanded tokens; the query
+        is a list of tokens or a token -> weight mapping
+        """
+        query_key = tuple(sorted(Counter(expanded_query).items()))
+        return list(self._cached_search(self.index_version, query_key, k))
+
+    def _search(self, index_version, query_key, k):
+        """
+        Rank the corpus for a normalized query; index_version only
+        takes part in the cache key
+        """
+        if self._index_stale:
+            self._build_index()
+        with instrumentation.stage("score"):
+            query_vector = {token: count * self.inverse_document_frequency(token) for token, count in query_key}
+            query_magnitude = math.sqrt(sum(val**2 for val in query_vector.values()))
             
-            similarity = self.calculate_cosine_similarity(query_vector, doc_vector)
-            document_scores.append((doc, similarity))
+            # Cosine similarity, accumulated only for documents containing a query token
+            scores = Counter()
+            for token, query_weight in query_vector.items():
+                for doc_index, doc_weight in self.inverted_index.get(token, ()):
+                    scores[doc_index] += query_weight * doc_weight
+        instrumentation.count("candidates", len(scores))
         
-        # Sort documents by relevance
-        ranked_documents = sorted(document_scores, key=lambda x: x[1], reverse=True)
-        return ranked_documents
+        # Rank by relevance, ties in corpus order; documents sharing no token score 0
+        with instrumentation.stage("sort"):
+            num_docs = len(self.document_corpus)
+            limit = num_docs if k is None else min(k, num_docs)
+            top = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+            unmatched = (doc_index for doc_index in range(num_docs) if doc_index not in scores)
+            ranked_documents = [(self.document_corpus[doc_index], score / query_magnitude) for doc_index, score in top]
+            ranked_documents.extend((self.document_corpus[doc_index], 0) for doc_index in islice(unmatched, limit - len(top)))
+        return tuple(ranked_documents)
+
+    def add_document(self, text):
+        """
+        Add a document to the corpus and invalidate cached rankings
+        """
+        self.document_corpus.append(text)
+        term_counts = Counter(ANALYZER.iter_tokens(text))
+        self.doc_term_counts.append(term_counts)
+        self.doc_freqs.update(term_counts.keys())
+        self._index_stale = True
+        self.index_version += 1
+        return len(self.document_corpus) - 1
+
+    def remove_document(self, index):
+        """
+        Remove the document at the given position and invalidate cached rankings
+        """
+        removed = self.document_corpus.pop(index)
+        self.doc_freqs.subtract(self.doc_term_counts.pop(index).keys())
+        self._index_stale = True
+        self.index_version += 1
+        return removed
+
+    def cache_info(self):
+        """
+        Hit/miss counters and current size of the result cache
+        """
+        return self._cached_search.cache_info()
 
     def voice_assistant_pipeline(self, user_query):
         """
@@ -111,19 +306,215 @@ class VoiceAssistantNN:
         print(f"Preprocessed Tokens: {preprocessed_tokens}")
         
         # 2. Semantic Understanding & Query Expansion
-        expanded_query = self.semantic_understanding(preprocessed_tokens)
+        expanded_query = self.semantic_expansion(preprocessed_tokens)
         print(f"Expanded Query: {expanded_query}")
         
         # 3. Search and Retrieve
-        results = self.search_and_retrieve(expanded_query)
+        results = self.search_and_retrieve(expanded_query, k=2)
         
         # 4. Return Top Results
         print("\nRetrieved Articles:")
-        for doc, score in results[:2]:  # Top 2 results
+        for doc, score in results:  # Top 2 results
             print(f"- {doc} (Relevance: {score:.2f})")
         
         return results
 
+    def process_queries(self, user_queries, k=2):
+        """
+        Run the pipeline stage by stage for a batch of queries without
+        printing, returning one result dict per query
+        """
+        token_lists = [self.preprocess_text(user_query) for user_query in user_queries]
+        expanded_queries = [self.semantic_expansion(tokens) for tokens in token_lists]
+        results = [self.search_and_retrieve(expanded_query, k=k) for expanded_query in expanded_queries]
+        return [
+            {"query": user_query, "tokens": tokens, "expanded_query": expanded_query, "results": ranked}
+            for user_query, tokens, expanded_query, ranked in zip(user_queries, token_lists, expanded_queries, results)
+        ]
+
+
+# Each server worker process holds its own assistant
+_worker_assistant = None
+
+def _init_worker(documents, assistant_options):
+    global _worker_assistant
+    _worker_assistant = VoiceAssistantNN(documents, **assistant_options)
+
+def _process_in_worker(user_queries, k):
+    return _worker_assistant.process_queries(user_queries, k)
+
+
+# Error result of queries the server stops before answering
+_SERVER_STOPPED = "The server stopped before answering the query."
+
+class VoiceAssistantServer:
+    """
+    Asyncio serving mode: concurrent queries are gathered into
+    micro-batches and answered by a process pool of assistants
+    """
+
+    def __init__(self, documents=None, workers=None, max_batch_size=32, batch_window=0.005,
+                 max_pending=1024, timeout=2.0, **assistant_options):
+        # Every worker builds an assistant from documents and assistant_options
+        self.documents = documents
+        self.assistant_options = assistant_options
+        self.workers = workers or os.cpu_count() or 1
+        # A batch closes after max_batch_size queries or batch_window seconds, whichever comes first
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        # Callers wait for room once max_pending queries are queued
+        self.max_pending = max_pending
+        # Seconds a query may spend queued and processed before it is answered with a timeout
+        self.timeout = timeout
+        self._queue = None
+        self._executor = None
+        self._batcher = None
+        self._slots = None
+        self._running = set()
+        self._stopping = False
+
+    async def start(self):
+        """
+        Start the worker processes and the batching loop
+        """
+        self._stopping = False
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.documents, self.assistant_options))
+        # At most one batch in flight per worker; the queue fills up behind them
+        self._slots = asyncio.Semaphore(self.workers)
+        self._batcher = asyncio.create_task(self._collect_batches())
+        return self
+
+    async def stop(self):
+        """
+        Stop batching and shut the worker processes down; queries
+        not answered yet get an error result instead of waiting
+        for their timeout
+        """
+        self._stopping = True
+        self._batcher.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._batcher
+        running = list(self._running)
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        while not self._queue.empty():
+            self._abandon([self._queue.get_nowait()])
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def submit(self, user_query, k=2):
+        """
+        Answer one query; returns a result dict whose status is
+        "ok", "timeout" or "error"
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        future = loop.create_future()
+        try:
+            result = await asyncio.wait_for(self._enqueue(user_query, k, future), self.timeout)
+            result["status"] = "ok"
+        except asyncio.TimeoutError:
+            result = {"query": user_query, "status": "timeout", "results": []}
+        except Exception as error:
+            result = {"query": user_query, "status": "error", "error": str(error), "results": []}
+        result["latency"] = loop.time() - started
+        return result
+
+    async def _enqueue(self, user_query, k, future):
+        if self._stopping:
+            raise RuntimeError(_SERVER_STOPPED)
+        await self._queue.put((user_query, k, future))
+        if self._stopping:
+            # stop() ran while this query waited for room in the queue
+            raise RuntimeError(_SERVER_STOPPED)
+        return await future
+
+    def _abandon(self, batch):
+        """
+        Answer the queries of a batch that are still waiting with
+        an error, as the server is stopping
+        """
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError(_SERVER_STOPPED))
+
+    async def _collect_batches(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        getter = None
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.batch_window
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    # asyncio.wait rather than wait_for, which can swallow a cancellation from stop()
+                    getter = asyncio.ensure_future(self._queue.get())
+                    try:
+                        await asyncio.wait((getter,), timeout=remaining)
+                    finally:
+                        getter.cancel()
+                    # Let the cancellation land; an item taken in the meantime is still kept
+                    await asyncio.wait((getter,))
+                    if getter.cancelled():
+                        break
+                    batch.append(getter.result())
+                await self._slots.acquire()
+                task = asyncio.create_task(self._run_batch(batch))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+                batch = []
+                getter = None
+        finally:
+            # Cancelled by stop() with queries taken from the queue but not handed to a
+            # batch, possibly one the getter took just as the cancellation arrived
+            if getter is not None and getter.done() and not getter.cancelled():
+                batch.append(getter.result())
+            self._abandon(batch)
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            # Queries that already timed out are skipped; the rest are grouped by k
+            by_k = {}
+            for user_query, k, future in batch:
+                if not future.done():
+                    by_k.setdefault(k, []).append((user_query, future))
+            for k, items in by_k.items():
+                try:
+                    results = await loop.run_in_executor(
+                        self._executor, _process_in_worker, [user_query for user_query, _ in items], k)
+                except Exception as error:
+                    for _, future in items:
+                        if not future.done():
+                            future.set_exception(error)
+                    continue
+                for (_, future), result in zip(items, results):
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            # Only left unanswered when stop() cancelled the batch
+            self._abandon(batch)
+            self._slots.release()
+
+
+async def serve_queries(user_queries, k=2, **server_options):
+    """
+    Answer a collection of queries concurrently through a
+    VoiceAssistantServer, returning their result dicts in order
+    """
+    async with VoiceAssistantServer(**server_options) as server:
+        return await asyncio.gather(*(server.submit(user_query, k) for user_query in user_queries))
+
 # Example Usage
 def main():
     voice_assistant = VoiceAssistantNN()
@@ -138,5 +529,20 @@ def main():
         print("\n" + "="*50)
         voice_assistant.voice_assistant_pipeline(query)
 
+    print(f"\nResult cache: {voice_assistant.cache_info()}")
+
+    # Serve the same queries concurrently, in micro-batches
+    print("\n" + "="*50)
+    for result in asyncio.run(serve_queries(test_queries, workers=2)):
+        if result["status"] == "timeout":
+            print(f"[timeout] {result['query']} -> no answer within the time limit")
+        elif result["status"] == "error":
+            print(f"[error] {result['query']} -> {result['error']}")
+        elif not result["results"]:
+            print(f"[ok] {result['query']} -> no matching documents")
+        else:
+            top_doc, top_score = result["results"][0]
+            print(f"[ok] {result['query']} -> {top_doc} (Relevance: {top_score:.2f})")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,69 +1,88 @@
 import math
 import random
 
+import numpy as np
+
+from ir_common import instrumentation
+from ir_common.ranking import top_k
+
 
 class BeliefNetwork:
-    def __init__(self):
+    def __init__(self, documents=None, queries=None, relevance_judgments=None, chunk_size=1024):
         # Sample dataset of documents
-        self.documents = [
-            "Machine learning is a subset of artificial intelligence",
-            "Information retrieval focuses on finding relevant documents",
-            "Probabilistic models help in ranking document relevance",
-            "Neural networks are powerful for pattern recognition",
-            "Data science combines statistics and computer science"
-        ]
+        if documents is None:
+            documents = [
+                "Machine learning is a subset of artificial intelligence",
+                "Information retrieval focuses on finding relevant documents",
+                "Probabilistic models help in ranking document relevance",
+                "Neural networks are powerful for pattern recognition",
+                "Data science combines statistics and computer science"
+            ]
+        self.documents = documents
         
         # Sample queries
-        self.queries = [
-            "machine learning",
-            "information retrieval",
-            "data science"
-        ]
+        if queries is None:
+            queries = [
+                "machine learning",
+                "information retrieval",
+                "data science"
+            ]
+        self.queries = queries
         
         # Simulated relevance judgments (binary)
-        self.relevance_judgments = {
-            ("machine learning", 0): 1,  # First doc is relevant
-            ("machine learning", 2): 0,  # Third doc is not relevant
-            ("information retrieval", 1): 1,
-            ("data science", 4): 1
-        }
-        
-        # Network structure with probabilities
-        self.network = {
-            'variables': {
-                'query': {},
-                'document_features': {},
-                'relevance': {}
-            },
-            'dependencies': {}
-        }
+        if relevance_judgments is None:
+            relevance_judgments = {
+                ("machine learning", 0): 1,  # First doc is relevant
+                ("machine learning", 2): 0,  # Third doc is not relevant
+                ("information retrieval", 1): 1,
+                ("data science", 4): 1
+            }
+        self.relevance_judgments = relevance_judgments
+        
+        # Number of queries scored together by the vectorized methods; bounds the
+        # chunk_size x len(documents) blocks held in memory
+        self.chunk_size = chunk_size
         
         # Initialize network probabilities
         self._initialize_network_probabilities()
     
     def _initialize_network_probabilities(self):
         """
-        Initialize probabilities for network variables.
+        Initialize probabilities for network variables as NumPy arrays.
         """
-        # Query prior probabilities
-        for query in self.queries:
-            self.network['variables']['query'][query] = 0.5
-        
-        # Document feature probabilities
-        for doc_idx, doc in enumerate(self.documents):
-            # Simple feature extraction (word count)
-            word_count = len(doc.split())
-            self.network['variables']['document_features'][doc_idx] = {
-                'word_count': word_count / max(len(doc.split()) for doc in self.documents)
-            }
+        # Query prior probabilities, one row per query
+        self.query_ids = {query: row for row, query in enumerate(self.queries)}
+        self.query_priors = np.full(len(self.queries), 0.5)
+        
+        # Document feature probabilities: word count relative to the longest document
+        word_counts = np.array([len(doc.split()) for doc in self.documents], dtype=np.float64)
+        self.word_count_features = word_counts / max(word_counts.max(initial=0), 1)
+        
+        # Relevance priors, stored sparsely: the judged documents of query row r are
+        # relevance_indices[relevance_indptr[r]:relevance_indptr[r + 1]]. Any judged
+        # pair counts as relevant, whatever its label.
+        judged = {}
+        for query, doc_idx in self.relevance_judgments:
+            if 0 <= doc_idx < len(self.documents):
+                judged.setdefault(query, set()).add(doc_idx)
+        judged_lists = [sorted(judged.get(query, ())) for query in self.queries]
+        self.relevance_indptr = np.zeros(len(self.queries) + 1, dtype=np.int64)
+        np.cumsum([len(doc_indices) for doc_indices in judged_lists], out=self.relevance_indptr[1:])
+        self.relevance_indices = np.array([doc_idx for doc_indices in judged_lists for doc_idx in doc_indices],
+                                          dtype=np.int64)
+    
+    @staticmethod
+    def _bayes_relevance(p_query, p_relevance, feature_influence):
+        """
+        Bayes' theorem relevance on scalars or broadcast arrays.
         
-        # Initialize relevance probabilities
-        for query in self.queries:
-            self.network['variables']['relevance'][query] = {}
-            for doc_idx in range(len(self.documents)):
-                # Base relevance calculation
-                relevance = 1 if (query, doc_idx) in self.relevance_judgments else 0
-                self.network['variables']['relevance'][query][doc_idx] = relevance
+        P(Relevance | Query) = P(Query | Relevance) * P(Relevance) / P(Query), where the
+        likelihood P(Query | Relevance) is simplified as a function of feature influence
+        and the marginal P(Query) is kept at or above 0.1.
+        """
+        p_query_given_relevance = np.minimum(feature_influence + p_relevance, 1.0)
+        relevance_probability = (p_query_given_relevance * p_relevance) / np.maximum(p_query, 0.1)
+        return np.clip(relevance_probability, 0, 1)
     
     def compute_bayes_relevance(self, query, document_index):
         """
@@ -76,30 +95,11 @@ class BeliefNetwork:
         Returns:
             float: Probability of document relevance
         """
-        # Prior probability of the query
-        p_query = self.network['variables']['query'].get(query, 0.5)
-        
-        # Prior probability of relevance
-        p_relevance = self.network['variables']['relevance'][query].get(document_index, 0)
-        
-        # Compute document features influence
-        doc_features = self.network['variables']['document_features'][document_index]
-        feature_influence = doc_features['word_count']
-        
-        # Bayes' theorem computation
-        # P(Relevance | Query) = P(Query | Relevance) * P(Relevance) / P(Query)
-        
-        # Likelihood: P(Query | Relevance)
-        # Simplified as a function of feature influence
-        p_query_given_relevance = min(feature_influence + p_relevance, 1.0)
-        
-        # Marginal probability of query (simplified)
-        p_query = max(p_query, 0.1)
-        
-        # Compute final relevance probability
-        relevance_probability = (p_query_given_relevance * p_relevance) / p_query
-        
-        return max(0, min(relevance_probability, 1))
+        row = self.query_ids[query]
+        judged = self.relevance_indices[self.relevance_indptr[row]:self.relevance_indptr[row + 1]]
+        p_relevance = 1 if document_index in judged else 0
+        return float(self._bayes_relevance(self.query_priors[row], p_relevance,
+                                           self.word_count_features[document_index]))
     
     def compute_joint_probability(self, query, document_index):
         """
@@ -116,31 +116,97 @@ class BeliefNetwork:
         p_relevance = self.compute_bayes_relevance(query, document_index)
         
         # Query probability
-        p_query = self.network['variables']['query'].get(query, 0.5)
+        p_query = float(self.query_priors[self.query_ids[query]])
         
         # Joint probability computation
         joint_prob = p_relevance * p_query
         
         return joint_prob
     
-    def evaluate_model(self):
+    def iter_probability_chunks(self, chunk_size=None):
+        """
+        Compute relevance and joint probabilities for every (query, document) pair,
+        chunk_size queries at a time.
+        
+        Args:
+            chunk_size (int): Queries per chunk; defaults to self.chunk_size
+        
+        Yields:
+            tuple: (first query row, relevance block, joint probability block), with
+                blocks of shape (queries in chunk, documents)
+        """
+        chunk_size = chunk_size or self.chunk_size
+        for start in range(0, len(self.queries), chunk_size):
+            stop = min(start + chunk_size, len(self.queries))
+            indptr = self.relevance_indptr[start:stop + 1]
+            p_relevance = np.zeros((stop - start, len(self.documents)))
+            rows = np.repeat(np.arange(stop - start), np.diff(indptr))
+            p_relevance[rows, self.relevance_indices[indptr[0]:indptr[-1]]] = 1
+            
+            with instrumentation.stage("score"):
+                p_query = self.query_priors[start:stop, None]
+                relevance = self._bayes_relevance(p_query, p_relevance, self.word_count_features[None, :])
+                joint = relevance * p_query
+            yield start, relevance, joint
+    
+    def compute_probability_matrices(self):
+        """
+        Compute the full query x document relevance and joint probability matrices.
+        
+        Returns:
+            tuple: (relevance matrix, joint probability matrix)
+        """
+        relevance_blocks, joint_blocks = [], []
+        for _, relevance, joint in self.iter_probability_chunks():
+            relevance_blocks.append(relevance)
+            joint_blocks.append(joint)
+        if not joint_blocks:
+            empty = np.zeros((0, len(self.documents)))
+            return empty, empty
+        return np.vstack(relevance_blocks), np.vstack(joint_blocks)
+    
+    def rank_documents(self, k=None, chunk_size=None):
+        """
+        Rank documents for every query by joint probability.
+        
+        Args:
+            k (int): Number of documents to keep per query; all when None
+            chunk_size (int): Queries scored together; defaults to self.chunk_size
+        
+        Returns:
+            list: One ranked list of (document index, joint probability) per query,
+                highest first and ties in document order
+        """
+        return list(self.iter_rankings(k, chunk_size))
+    
+    def iter_rankings(self, k=None, chunk_size=None):
+        """
+        Like rank_documents, but yield each query's ranked list as soon as its chunk
+        has been scored.
+        
+        Args:
+            k (int): Number of documents to keep per query; all when None
+            chunk_size (int): Queries scored together; defaults to self.chunk_size
+        
+        Yields:
+            list: Ranked (document index, joint probability) pairs for one query
+        """
+        for _, _, joint in self.iter_probability_chunks(chunk_size):
+            with instrumentation.stage("sort"):
+                rankings = [top_k(scores, k) for scores in joint]
+            yield from rankings
+    
+    def evaluate_model(self, k=None):
         """
         Evaluate the Belief Network by computing relevance probabilities.
+        
+        Args:
+            k (int): Number of documents to show per query; all when None
         """
         print("Belief Network Evaluation:")
-        for query in self.queries:
+        for query, doc_relevances in zip(self.queries, self.iter_rankings(k)):
             print(f"\nQuery: '{query}'")
             
-            # Compute and rank document relevances
-            doc_relevances = []
-            for doc_idx in range(len(self.documents)):
-                # Compute joint probability as relevance metric
-                joint_prob = self.compute_joint_probability(query, doc_idx)
-                doc_relevances.append((doc_idx, joint_prob))
-            
-            # Sort and display results
-            doc_relevances.sort(key=lambda x: x[1], reverse=True)
-            
             for rank, (doc_idx, relevance) in enumerate(doc_relevances, 1):
                 print(f"Rank {rank}: Document '{self.documents[doc_idx]}' (Relevance: {relevance:.4f})")
 
@@ -1,60 +1,164 @@
 import math
 import random
+from array import array
+from itertools import chain
+
+import numpy as np
+
+from ir_common import instrumentation
+from ir_common.ranking import top_k
+
+
+def read_qrels(path, doc_ids=None):
+    """
+    Stream relevance judgments from a TREC-style qrels file.
+    
+    Each line is "query_id iteration doc_id relevance" (the iteration column may be
+    left out); any relevance above 0 counts as relevant.
+    
+    Args:
+        path (str): Path to the qrels file
+        doc_ids (dict): Maps document IDs in the file to document indices; when None
+            the IDs must be the indices themselves. Unknown IDs are skipped.
+    
+    Yields:
+        tuple: (query, document index, 0 or 1)
+    """
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, 1):
+            fields = line.split()
+            if not fields:
+                continue
+            if len(fields) == 4:
+                query, _, doc_id, relevance = fields
+            elif len(fields) == 3:
+                query, doc_id, relevance = fields
+            else:
+                raise ValueError(f"{path}:{line_number}: expected 'query_id [iteration] doc_id relevance'")
+            if doc_ids is None:
+                doc_idx = int(doc_id)
+            elif doc_id in doc_ids:
+                doc_idx = doc_ids[doc_id]
+            else:
+                continue
+            yield query, doc_idx, 1 if int(relevance) > 0 else 0
 
 
 class InterferenceModel:
-    def __init__(self):
+    def __init__(self, documents=None, queries=None, relevance_judgments=None, qrels_path=None, doc_ids=None):
         # Sample dataset of documents
-        self.documents = [
-            "Machine learning is a subset of artificial intelligence",
-            "Information retrieval focuses on finding relevant documents",
-            "Probabilistic models help in ranking document relevance",
-            "Neural networks are powerful for pattern recognition",
-            "Data science combines statistics and computer science"
-        ]
+        if documents is None:
+            documents = [
+                "Machine learning is a subset of artificial intelligence",
+                "Information retrieval focuses on finding relevant documents",
+                "Probabilistic models help in ranking document relevance",
+                "Neural networks are powerful for pattern recognition",
+                "Data science combines statistics and computer science"
+            ]
+        self.documents = documents
         
         # Sample queries
-        self.queries = [
-            "machine learning",
-            "information retrieval",
-            "data science"
-        ]
-        
-        # Simulated relevance judgments (binary)
-        self.relevance_judgments = {
-            ("machine learning", 0): 1,  # First doc is relevant
-            ("machine learning", 2): 0,  # Third doc is not relevant
-            ("information retrieval", 1): 1,
-            ("data science", 4): 1
-        }
-        
-        # Probabilities for the interference model
-        self.query_probabilities = {}
-        self.document_probabilities = {}
+        if queries is None:
+            queries = [
+                "machine learning",
+                "information retrieval",
+                "data science"
+            ]
+        self.queries = queries
+        
+        # Simulated relevance judgments (binary), unless they are streamed from a qrels file
+        if relevance_judgments is None and qrels_path is None:
+            relevance_judgments = {
+                ("machine learning", 0): 1,  # First doc is relevant
+                ("machine learning", 2): 0,  # Third doc is not relevant
+                ("information retrieval", 1): 1,
+                ("data science", 4): 1
+            }
+        judgments = ((query, doc_idx, label) for (query, doc_idx), label in (relevance_judgments or {}).items())
+        if qrels_path is not None:
+            judgments = chain(judgments, read_qrels(qrels_path, doc_ids))
+        
+        # Integer IDs for every query seen in the model or the judgments
+        self.query_ids = {}
+        for query in self.queries:
+            self.query_ids.setdefault(query, len(self.query_ids))
+        
+        # Judgments indexed by query ID: the judged documents of query q, sorted, are
+        # judged_docs[judged_indptr[q]:judged_indptr[q + 1]], with labels alongside
+        self._index_judgments(judgments)
         
         # Compute initial probabilities
         self._compute_initial_probabilities()
     
+    def _index_judgments(self, judgments):
+        """
+        Pack (query, document index, label) judgments into per-query arrays.
+        A repeated (query, document) pair keeps its last label.
+        """
+        query_column, doc_column, label_column = array('q'), array('q'), array('b')
+        for query, doc_idx, label in judgments:
+            query_id = self.query_ids.setdefault(query, len(self.query_ids))
+            query_column.append(query_id)
+            doc_column.append(doc_idx)
+            label_column.append(label)
+        
+        query_column = np.array(query_column, dtype=np.int64)
+        doc_column = np.array(doc_column, dtype=np.int64)
+        labels = np.array(label_column, dtype=np.int8)
+        
+        # np.unique on the reversed keys finds each pair's last occurrence and sorts by (query, document)
+        doc_offset = doc_column.min(initial=0)
+        doc_span = doc_column.max(initial=0) - doc_offset + 1
+        keys = query_column * doc_span + (doc_column - doc_offset)
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep = len(keys) - 1 - last
+        
+        self.judged_docs = doc_column[keep]
+        self.judged_labels = labels[keep]
+        self.judged_indptr = np.zeros(len(self.query_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(query_column[keep], minlength=len(self.query_ids)), out=self.judged_indptr[1:])
+    
     def _compute_initial_probabilities(self):
         """
         Compute initial probabilities for queries and documents
         based on the dataset and relevance judgments.
         """
-        # Compute query probabilities
-        for query in self.queries:
-            relevant_docs = sum(
-                1 for (q, doc_idx) in self.relevance_judgments 
-                if q == query and self.relevance_judgments[(q, doc_idx)] == 1
-            )
-            self.query_probabilities[query] = relevant_docs / len(self.documents)
-        
-        # Compute document probabilities
-        for i, doc in enumerate(self.documents):
-            relevant_count = sum(
-                1 for (query, doc_idx) in self.relevance_judgments 
-                if doc_idx == i and self.relevance_judgments.get((query, doc_idx), 0) == 1
-            )
-            self.document_probabilities[i] = relevant_count / len(self.queries)
+        num_query_ids = len(self.query_ids)
+        relevant = self.judged_labels == 1
+        judged_query_ids = np.repeat(np.arange(num_query_ids), np.diff(self.judged_indptr))
+        
+        # Compute query probabilities, indexed by query ID; queries outside self.queries fall back to 0.1
+        self.query_relevant_counts = np.bincount(judged_query_ids[relevant], minlength=num_query_ids)
+        self.query_probabilities = np.full(num_query_ids, 0.1)
+        listed = np.array(sorted({self.query_ids[query] for query in self.queries}), dtype=np.int64)
+        if len(self.documents):
+            self.query_probabilities[listed] = self.query_relevant_counts[listed] / len(self.documents)
+        
+        # Compute document probabilities, indexed by document
+        relevant_docs = self.judged_docs[relevant]
+        relevant_docs = relevant_docs[(relevant_docs >= 0) & (relevant_docs < len(self.documents))]
+        self.document_relevant_counts = np.bincount(relevant_docs, minlength=len(self.documents))
+        self.document_probabilities = self.document_relevant_counts / max(len(self.queries), 1)
+    
+    def _judgments_for(self, query):
+        query_id = self.query_ids.get(query)
+        if query_id is None:
+            return self.judged_docs[:0], self.judged_labels[:0]
+        start, stop = self.judged_indptr[query_id], self.judged_indptr[query_id + 1]
+        return self.judged_docs[start:stop], self.judged_labels[start:stop]
+    
+    def _query_probability(self, query):
+        query_id = self.query_ids.get(query)
+        return 0.1 if query_id is None else float(self.query_probabilities[query_id])
+    
+    @staticmethod
+    def _interference(query_prob, doc_prob):
+        """
+        Interference formula on scalars or arrays; 0 where the denominator is 0.
+        """
+        denominator = query_prob + doc_prob - query_prob * doc_prob
+        return np.divide(query_prob * doc_prob, denominator,
+                         out=np.zeros(np.broadcast(query_prob, doc_prob).shape), where=denominator != 0)
     
     def compute_relevance(self, query, document_index):
         """
@@ -68,46 +172,55 @@ class InterferenceModel:
             float: Probability of relevance
         """
         # Check if we have a direct relevance judgment
-        if (query, document_index) in self.relevance_judgments:
-            return self.relevance_judgments[(query, document_index)]
+        judged_docs, labels = self._judgments_for(query)
+        position = np.searchsorted(judged_docs, document_index)
+        if position < len(judged_docs) and judged_docs[position] == document_index:
+            return int(labels[position])
         
         # Compute relevance based on query and document probabilities
-        query_prob = self.query_probabilities.get(query, 0.1)
-        doc_prob = self.document_probabilities.get(document_index, 0.1)
+        query_prob = self._query_probability(query)
+        if 0 <= document_index < len(self.documents):
+            doc_prob = self.document_probabilities[document_index]
+        else:
+            doc_prob = 0.1
         
         # Interference model relevance calculation
         # Uses a probabilistic interference formula
-        relevance_prob = (query_prob * doc_prob) / (query_prob + doc_prob - query_prob * doc_prob)
-        
-        return relevance_prob
+        return float(self._interference(query_prob, doc_prob))
     
-    def retrieve_documents(self, query):
+    def retrieve_documents(self, query, k=None):
         """
         Retrieve and rank documents for a given query based on relevance.
         
         Args:
             query (str): The search query
+            k (int): Number of documents to return; all when None
         
         Returns:
             list: Ranked list of document indices with their relevance scores
         """
-        # Compute relevance for all documents
-        doc_relevances = [
-            (idx, self.compute_relevance(query, idx)) 
-            for idx in range(len(self.documents))
-        ]
-        
-        # Sort documents by relevance in descending order
-        return sorted(doc_relevances, key=lambda x: x[1], reverse=True)
+        # Compute relevance for all documents at once, then apply the direct judgments
+        with instrumentation.stage("score"):
+            scores = self._interference(self._query_probability(query), self.document_probabilities)
+            judged_docs, labels = self._judgments_for(query)
+            in_range = (judged_docs >= 0) & (judged_docs < len(self.documents))
+            scores[judged_docs[in_range]] = labels[in_range]
+        
+        # Sort documents by relevance in descending order, ties in document order
+        with instrumentation.stage("sort"):
+            return top_k(scores, k)
     
-    def evaluate_model(self):
+    def evaluate_model(self, k=None):
         """
         Evaluate the Interference Model by running queries and displaying results.
+        
+        Args:
+            k (int): Number of documents to show per query; all when None
         """
         print("Interference Model Evaluation:")
         for query in self.queries:
             print(f"\nQuery: '{query}'")
-            ranked_docs = self.retrieve_documents(query)
+            ranked_docs = self.retrieve_documents(query, k)
             
             for rank, (doc_idx, relevance) in enumerate(ranked_docs, 1):
                 print(f"Rank {rank}: Document '{self.documents[doc_idx]}' (Relevance: {relevance:.4f})")
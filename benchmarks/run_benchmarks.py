@@ -0,0 +1,440 @@
+"""Reproducible benchmarks for the retrieval models of the assignments.
+
+Every model indexes the same seeded synthetic corpus (Zipf-distributed terms) and
+answers the same seeded queries. Per model and corpus size the run reports index
+build time, peak memory while building, queries per second and p50/p95/p99 query
+latency, and can save everything as JSON to compare a later run against.
+
+    pip install -e .  # once, from the repository root, for the shared ir_common helpers
+    python benchmarks/run_benchmarks.py --sizes 1000 10000 --output benchmarks/latest.json
+    python benchmarks/run_benchmarks.py --models tfidf dice --instrument
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json
+
+With --instrument the per-stage timers and counters (tokenize, expand, score,
+sort) recorded while answering the queries are included in the results.
+"""
+import argparse
+import ast
+import gc
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from ir_common import instrumentation
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+# The most frequent words of the synthetic corpus, so stopword handling is exercised too
+COMMON_WORDS = ["the", "of", "and", "to", "a", "in", "is", "for", "on", "with"]
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+# Result fields compared by --compare, and whether a larger value is better
+COMPARED_METRICS = {
+    "build_seconds": False,
+    "peak_memory_bytes": False,
+    "qps": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+
+
+def synthetic_vocabulary(vocab_size):
+    """The common words followed by distinct lowercase pseudo-words, most frequent first."""
+    words = list(COMMON_WORDS[:vocab_size])
+    rank = 0
+    while len(words) < vocab_size:
+        word, n = "", rank
+        while True:
+            word = LETTERS[n % 26] + word
+            n = n // 26 - 1
+            if n < 0:
+                break
+        words.append("x" + word)
+        rank += 1
+    return words
+
+
+def zipf_probabilities(vocab_size, exponent):
+    weights = 1.0 / np.arange(1, vocab_size + 1) ** exponent
+    return weights / weights.sum()
+
+
+def synthetic_corpus(num_docs, vocab_size=50000, mean_length=40, exponent=1.1, seed=0):
+    """num_docs documents of Zipf-distributed words; the same seed gives the same corpus."""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array(synthetic_vocabulary(vocab_size), dtype=object)
+    probabilities = zipf_probabilities(vocab_size, exponent)
+    lengths = rng.poisson(mean_length - 1, num_docs) + 1
+    documents = []
+    # Sampled in blocks so a million documents never need all their words at once
+    for start in range(0, num_docs, 10000):
+        block = lengths[start:start + 10000]
+        words = vocabulary[rng.choice(vocab_size, size=int(block.sum()), p=probabilities)]
+        offsets = np.concatenate(([0], np.cumsum(block)))
+        documents.extend(" ".join(words[offsets[i]:offsets[i + 1]]) for i in range(len(block)))
+    return documents
+
+
+def synthetic_queries(num_queries, vocab_size=50000, max_terms=3, exponent=1.1, seed=0):
+    """
+    Seeded keyword queries of 1 to max_terms words.
+
+    Query words follow the corpus distribution minus the common words, so most of them
+    occur in the corpus without every query hitting the most frequent terms.
+    """
+    rng = np.random.default_rng([seed, 1])
+    vocabulary = synthetic_vocabulary(vocab_size)[len(COMMON_WORDS):]
+    probabilities = zipf_probabilities(len(vocabulary), exponent)
+    lengths = rng.integers(1, max_terms + 1, num_queries)
+    return [" ".join(vocabulary[i] for i in rng.choice(len(vocabulary), size=n, p=probabilities))
+            for n in lengths]
+
+
+def boolean_queries(queries, seed=0):
+    """The keyword queries with AND/OR between their words, for the Boolean model."""
+    rng = np.random.default_rng([seed, 2])
+    boolean = []
+    for query in queries:
+        words = query.split()
+        operators = rng.choice(["AND", "OR"], size=len(words) - 1)
+        boolean.append(" ".join([words[0]] + [part for pair in zip(operators, words[1:]) for part in pair]))
+    return boolean
+
+
+def load_notebook(path):
+    """
+    Define a notebook's imports, functions, classes and UPPERCASE constants in a fresh
+    namespace, skipping the demo statements that would otherwise run.
+    """
+    with open(path, encoding="utf-8") as file:
+        cells = json.load(file)["cells"]
+    namespace = {"__name__": os.path.splitext(os.path.basename(path))[0]}
+    for cell in cells:
+        if cell["cell_type"] != "code":
+            continue
+        source = "".join(cell["source"])
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            continue
+        tree.body = [node for node in tree.body if _is_definition(node)]
+        exec(compile(tree, path, "exec"), namespace)
+    return namespace
+
+
+def _is_definition(node):
+    if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)):
+        return True
+    return (isinstance(node, ast.Assign)
+            and all(isinstance(target, ast.Name) and target.id.isupper() for target in node.targets))
+
+
+def load_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _repo_path(*parts):
+    return os.path.join(REPO_ROOT, *parts)
+
+
+# Each model is a loader returning its module (or notebook namespace), a build function,
+# called with (module, documents, queries), and a query function, called with
+# (model, query, k). Loading happens once, outside the measurements. The belief network
+# ranks all of its queries in one pass, so it runs through a per-query iterator instead.
+
+def load_week_01():
+    return load_notebook(_repo_path("Assignment 01", "week_01.ipynb"))
+
+
+def load_week_02():
+    return load_module(_repo_path("Assignment 02", "week_02.py"), "week_02")
+
+
+def load_week_03():
+    return load_notebook(_repo_path("Assignment_03", "week_03.ipynb"))
+
+
+def load_week_05():
+    return load_notebook(_repo_path("Assignment_05", "week_05.ipynb"))
+
+
+def load_assignment_06():
+    return load_module(_repo_path("Assignment_06", "assignment_06.py"), "assignment_06")
+
+
+def load_belief_model():
+    return load_module(_repo_path("Assignment_07", "belief_model.py"), "belief_model")
+
+
+def load_inference_model():
+    return load_module(_repo_path("Assignment_07", "inference_model.py"), "inference_model")
+
+
+def build_inverted_index(notebook, documents, queries):
+    index = notebook["InvertedIndex"]()
+    for doc_id, text in enumerate(documents):
+        index.create_indexer(doc_id, f"doc{doc_id}", text)
+    return index
+
+
+def query_inverted_index(index, query, k):
+    # The index answers single-word lookups
+    return index.search(query.split()[0])
+
+
+def build_tfidf(week_02, documents, queries):
+    tokenized = [week_02.preprocess(text) for text in documents]
+    return week_02.TfidfSearchEngine(tokenized, [f"doc{doc_id}" for doc_id in range(len(documents))])
+
+
+def query_tfidf(engine, query, k):
+    return engine.rank(query, k)
+
+
+def build_dice(notebook, documents, queries):
+    # week_03's binary_independence_model ranks by the Dice coefficient through this
+    # model, rebuilding it on every call; the benchmark builds it once and reuses it
+    return notebook["DiceRetrievalModel"](documents)
+
+
+def query_dice(model, query, k):
+    return model.top_k(query, k)
+
+
+def build_boolean(notebook, documents, queries):
+    return notebook["BooleanExtendedIRModel"](documents, verbose=False)
+
+
+def query_boolean(model, query, k):
+    return model.rank_documents(model.process_query(query))
+
+
+def query_pnorm(model, query, k):
+    return model.rank_pnorm(query, k)
+
+
+def build_voice_assistant(assignment_06, documents, queries):
+    assistant = assignment_06.VoiceAssistantNN(documents)
+    # The corpus index is built by the first search; count it as part of the build
+    assistant.search_and_retrieve([], k=1)
+    return assistant
+
+
+def query_voice_assistant(assistant, query, k):
+    tokens = assistant.preprocess_text(query)
+    return assistant.search_and_retrieve(assistant.semantic_expansion(tokens), k)
+
+
+def synthetic_judgments(documents, queries, seed=0):
+    """Two seeded binary relevance judgments per query."""
+    rng = np.random.default_rng([seed, 3])
+    judged = rng.integers(0, len(documents), (len(queries), 2))
+    labels = rng.integers(0, 2, (len(queries), 2))
+    return {(query, int(doc_index)): int(label)
+            for query, doc_indices, query_labels in zip(queries, judged, labels)
+            for doc_index, label in zip(doc_indices, query_labels)}
+
+
+def build_belief_network(belief_model, documents, queries):
+    return belief_model.BeliefNetwork(documents, queries, synthetic_judgments(documents, queries))
+
+
+def build_inference_network(inference_model, documents, queries):
+    return inference_model.InterferenceModel(documents, queries, synthetic_judgments(documents, queries))
+
+
+def query_inference_network(model, query, k):
+    return model.retrieve_documents(query, k)
+
+
+MODELS = {
+    "inverted_index": (load_week_01, build_inverted_index, query_inverted_index),
+    "tfidf": (load_week_02, build_tfidf, query_tfidf),
+    "dice": (load_week_03, build_dice, query_dice),
+    "boolean": (load_week_05, build_boolean, query_boolean),
+    "pnorm": (load_week_05, build_boolean, query_pnorm),
+    "voice_assistant": (load_assignment_06, build_voice_assistant, query_voice_assistant),
+    "belief_network": (load_belief_model, build_belief_network, None),
+    "inference_network": (load_inference_model, build_inference_network, query_inference_network),
+}
+
+
+def timed_queries(name, model, queries, k):
+    """Latency in seconds of every query, in order."""
+    latencies = []
+    if name == "belief_network":
+        rankings = model.iter_rankings(k, chunk_size=1)
+        for _ in queries:
+            started = time.perf_counter()
+            next(rankings)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+    run_query = MODELS[name][2]
+    for query in queries:
+        started = time.perf_counter()
+        run_query(model, query, k)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def benchmark_model(name, documents, queries, k=10, measure_memory=True, instrument=False):
+    """Build one model over documents, answer the queries and summarise the measurements."""
+    load, build, _ = MODELS[name]
+    module = load()
+    if name == "boolean":
+        queries = boolean_queries(queries)
+
+    peak_memory = None
+    if measure_memory:
+        # Tracing slows the build down, so memory is measured on a separate, untimed build
+        gc.collect()
+        tracemalloc.start()
+        try:
+            build(module, documents, queries)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    gc.collect()
+    started = time.perf_counter()
+    model = build(module, documents, queries)
+    build_seconds = time.perf_counter() - started
+
+    if instrument:
+        with instrumentation.instrumented() as stats:
+            latencies = timed_queries(name, model, queries, k)
+    else:
+        latencies = timed_queries(name, model, queries, k)
+    latencies_ms = np.array(latencies) * 1000.0
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+
+    result = {
+        "model": name,
+        "documents": len(documents),
+        "queries": len(queries),
+        "build_seconds": build_seconds,
+        "peak_memory_bytes": peak_memory,
+        "qps": len(latencies) / sum(latencies) if sum(latencies) > 0 else None,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+    if instrument:
+        result.update(stats.report())
+    return result
+
+
+def run_benchmarks(sizes, models, num_queries=200, k=10, seed=0, measure_memory=True,
+                   instrument=False, vocab_size=50000, progress=print):
+    results = []
+    queries = synthetic_queries(num_queries, vocab_size, seed=seed)
+    for size in sizes:
+        documents = synthetic_corpus(size, vocab_size, seed=seed)
+        for name in models:
+            result = benchmark_model(name, documents, queries, k, measure_memory, instrument)
+            results.append(result)
+            if progress is not None:
+                progress(format_result(result))
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "seed": seed,
+            "sizes": list(sizes),
+            "queries": num_queries,
+            "k": k,
+            "vocab_size": vocab_size,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def format_result(result):
+    memory = result["peak_memory_bytes"]
+    memory = f"{memory / 2 ** 20:8.1f} MiB" if memory is not None else "        -    "
+    qps = f"{result['qps']:10.1f}" if result["qps"] is not None else "         -"
+    line = (f"{result['model']:<18} {result['documents']:>9} docs  build {result['build_seconds']:8.3f} s  "
+            f"peak {memory}  {qps} q/s  p50 {result['p50_ms']:8.3f}  p95 {result['p95_ms']:8.3f}  "
+            f"p99 {result['p99_ms']:8.3f} ms")
+    for stage, timing in result.get("stages", {}).items():
+        line += f"\n    {stage:<10} {timing['seconds']:10.4f} s  {timing['calls']:>8} calls"
+    for counter, value in result.get("counters", {}).items():
+        line += f"\n    {counter:<10} {value:>12}"
+    return line
+
+
+def compare_results(baseline, current, threshold=0.2):
+    """
+    Relative change of each compared metric for the (model, documents) pairs present in
+    both runs, as (model, documents, metric, baseline, current, change, regressed) rows.
+    A metric regresses when it is worse than the baseline by more than threshold.
+    """
+    baseline_results = {(result["model"], result["documents"]): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        previous = baseline_results.get((result["model"], result["documents"]))
+        if previous is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = -change > threshold if higher_is_better else change > threshold
+            rows.append((result["model"], result["documents"], metric, old, new, change, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000],
+                        help="corpus sizes in documents (default: 1000 10000)")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS), default=list(MODELS),
+                        help="models to benchmark (default: all)")
+    parser.add_argument("--queries", type=int, default=200, help="queries per model and size")
+    parser.add_argument("--k", type=int, default=10, help="results requested per query")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the corpus and query generators")
+    parser.add_argument("--vocab-size", type=int, default=50000, help="distinct words in the corpus")
+    parser.add_argument("--instrument", action="store_true", help="record per-stage timers and counters")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced build measuring peak memory")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare against the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative change counted as a regression by --compare (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.models, args.queries, args.k, args.seed,
+                            not args.no_memory, args.instrument, args.vocab_size)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        rows = compare_results(baseline, report, args.threshold)
+        print(f"\nCompared with {args.compare}:")
+        for model, documents, metric, old, new, change, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{model:<18} {documents:>9}  {metric:<18} {old:14.4f} -> {new:14.4f}  {change:+8.1%}{flag}")
+        if any(row[-1] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
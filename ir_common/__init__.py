@@ -0,0 +1,7 @@
+"""Helpers shared by the assignment modules.
+
+Install them once from the repository root, so the assignment scripts and notebooks
+can import them from their own folders:
+
+    pip install -e .
+"""
@@ -0,0 +1,222 @@
+"""Streaming tokenization shared by the assignment modules.
+
+An Analyzer reproduces one of the tokenizers the modules started out with:
+
+    SPLIT              lowercase, split on whitespace (week_03, week_05, assignment_06)
+    WORDS              lowercase, runs of word characters (week_01)
+    STRIP_PUNCTUATION  drop punctuation, lowercase, split on whitespace (week_02)
+
+Text is analysed in bounded chunks cut at whitespace, so no token straddles two chunks
+and a file of any size is tokenized without ever being read whole:
+
+    analyzer = Analyzer(WORDS, stopwords={"the", "of"})
+    for term_id in analyzer.iter_term_ids(iter_file_chunks("corpus.txt")):
+        ...
+
+shared_analyzer returns one Analyzer per mode and stopword set, all interning into
+SHARED_VOCABULARY, so the modules of one process share query caches and term IDs.
+"""
+import codecs
+import mmap
+import os
+import re
+import threading
+
+from ir_common.caching import cached_method
+
+SPLIT = "split"
+WORDS = "words"
+STRIP_PUNCTUATION = "strip_punctuation"
+
+WORD = re.compile(r"\b\w+\b")
+PUNCTUATION = re.compile(r"[^\w\s]")
+
+# Whitespace a chunk may be cut after; in every mode it ends the token before it
+CUT_CHARACTERS = " \n\t\r\f\v"
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Longest run without whitespace kept whole; longer runs are cut into pieces
+DEFAULT_MAX_TOKEN_LENGTH = 1 << 20
+
+
+def _split_tokens(segment):
+    return segment.lower().split()
+
+
+def _word_tokens(segment):
+    return WORD.findall(segment.lower())
+
+
+def _strip_punctuation_tokens(segment):
+    return PUNCTUATION.sub("", segment).lower().split()
+
+
+_SEGMENT_TOKENIZERS = {
+    SPLIT: _split_tokens,
+    WORDS: _word_tokens,
+    STRIP_PUNCTUATION: _strip_punctuation_tokens,
+}
+
+
+def iter_file_chunks(path, encoding="utf-8", chunk_size=DEFAULT_CHUNK_SIZE, use_mmap=True):
+    """
+    Yield the decoded text of a file in pieces of at most chunk_size bytes' worth.
+
+    With use_mmap the file is memory-mapped and decoded slice by slice, otherwise it is
+    read chunk by chunk; either way only one chunk is held in memory at a time. The file
+    is opened by the call itself, so a missing file fails before any chunk is consumed.
+    """
+    return _iter_file_chunks(open(path, "rb"), encoding, chunk_size, use_mmap)
+
+
+def _iter_file_chunks(file, encoding, chunk_size, use_mmap):
+    decoder = codecs.getincrementaldecoder(encoding)()
+    with file:
+        if use_mmap and os.fstat(file.fileno()).st_size:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for start in range(0, len(mapped), chunk_size):
+                    yield decoder.decode(mapped[start:start + chunk_size])
+        else:
+            for chunk in iter(lambda: file.read(chunk_size), b""):
+                yield decoder.decode(chunk)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+class Vocabulary:
+    """Terms interned to dense integer IDs, in order of first appearance."""
+
+    def __init__(self, terms=()):
+        self.ids = {}
+        self.terms = []
+        self._lock = threading.Lock()
+        for term in terms:
+            self.intern(term)
+
+    def intern(self, term):
+        """The ID of term, allocating the next one for a new term; safe to call from threads."""
+        term_id = self.ids.get(term)
+        if term_id is None:
+            with self._lock:
+                term_id = self.ids.get(term)
+                if term_id is None:
+                    # Append first, so a reader never sees an ID without its term
+                    term_id = len(self.terms)
+                    self.terms.append(term)
+                    self.ids[term] = term_id
+        return term_id
+
+    def get(self, term, default=None):
+        """The ID of term, or default if it was never interned."""
+        return self.ids.get(term, default)
+
+    def __contains__(self, term):
+        return term in self.ids
+
+    def __len__(self):
+        return len(self.terms)
+
+
+class Analyzer:
+    """
+    Tokenizer for one of the modes above, with optional stopword removal, a vocabulary
+    for term IDs (several analyzers may share one) and a cache for short strings.
+
+    A run of text without whitespace longer than max_token_length characters is cut even
+    so, and its pieces analysed separately, so minified or unsegmented text (CJK, for
+    instance) is still processed in bounded pieces.
+    """
+
+    def __init__(self, mode=SPLIT, stopwords=None, vocabulary=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 cache_size=4096, max_cached_length=256, max_token_length=DEFAULT_MAX_TOKEN_LENGTH):
+        if mode not in _SEGMENT_TOKENIZERS:
+            raise ValueError(f"Unknown analyzer mode: {mode!r}")
+        self.mode = mode
+        self._tokenize_segment = _SEGMENT_TOKENIZERS[mode]
+        self.stopwords = frozenset(stopwords or ())
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        self.chunk_size = chunk_size
+        self.max_token_length = max_token_length
+
+        # Strings up to max_cached_length characters (queries, titles) are analysed once
+        self.max_cached_length = max_cached_length
+        self._cached_analysis = cached_method(self._analyze, cache_size)
+
+    def iter_segments(self, chunks):
+        """
+        Regroup text chunks into segments ending at whitespace, so no token is cut in two
+        unless it runs past max_token_length.
+        """
+        carry = ""
+        for chunk in chunks:
+            buffer = carry + chunk if carry else chunk
+            cut = max(map(buffer.rfind, CUT_CHARACTERS)) + 1
+            if cut == 0:
+                if len(buffer) < self.max_token_length:
+                    # No whitespace yet: the buffer is all one unfinished token
+                    carry = buffer
+                    continue
+                # No whitespace for too long: cut anyway rather than hold the rest of the text
+                cut = len(buffer)
+            carry = buffer[cut:]
+            yield buffer[:cut]
+        if carry:
+            yield carry
+
+    def iter_tokens(self, text):
+        """
+        Yield the tokens of text, a string or an iterable of string chunks such as
+        iter_file_chunks, analysing at most about chunk_size characters at a time.
+        """
+        if isinstance(text, str):
+            if len(text) <= self.chunk_size:
+                segments = (text,)
+            else:
+                segments = self.iter_segments(text[start:start + self.chunk_size]
+                                              for start in range(0, len(text), self.chunk_size))
+        else:
+            segments = self.iter_segments(text)
+
+        stopwords = self.stopwords
+        for segment in segments:
+            tokens = self._tokenize_segment(segment)
+            if stopwords:
+                yield from (token for token in tokens if token not in stopwords)
+            else:
+                yield from tokens
+
+    def iter_term_ids(self, text):
+        """Yield the vocabulary IDs of the tokens of text, interning new terms."""
+        intern = self.vocabulary.intern
+        for token in self.iter_tokens(text):
+            yield intern(token)
+
+    def analyze(self, text):
+        """The tokens of a string as a tuple; short strings are served from the cache."""
+        if len(text) <= self.max_cached_length:
+            return self._cached_analysis(text)
+        return self._analyze(text)
+
+    def _analyze(self, text):
+        return tuple(self.iter_tokens(text))
+
+    def cache_info(self):
+        """Hit/miss statistics of the short-string cache."""
+        return self._cached_analysis.cache_info()
+
+
+SHARED_VOCABULARY = Vocabulary()
+_shared_analyzers = {}
+_shared_analyzers_lock = threading.Lock()
+
+
+def shared_analyzer(mode=SPLIT, stopwords=None):
+    """The process-wide Analyzer for a mode and stopword set, interning into SHARED_VOCABULARY."""
+    key = (mode, frozenset(stopwords or ()))
+    with _shared_analyzers_lock:
+        analyzer = _shared_analyzers.get(key)
+        if analyzer is None:
+            analyzer = _shared_analyzers[key] = Analyzer(mode, key[1], SHARED_VOCABULARY)
+        return analyzer
@@ -0,0 +1,40 @@
+"""Splitting a list of files into batches for a pool of indexing workers.
+
+    for batch in batch_files(file_paths, workers=4, max_worker_memory=256 << 20):
+        ...  # hand the batch to a worker, merge its partial index in batch order
+"""
+import os
+
+# Rough bytes of partial index a worker holds per byte of input file
+PARTIAL_INDEX_OVERHEAD = 8
+
+# Batches per worker, so a slow batch does not leave the other workers idle
+BATCHES_PER_WORKER = 4
+
+
+def batch_files(file_paths, workers, max_worker_memory=None):
+    """
+    Split files into contiguous batches, a few per worker and within the memory cap.
+
+    max_worker_memory (bytes) bounds the partial index built from one batch; a single file
+    larger than the cap still gets a batch of its own. Raises ValueError if workers < 1.
+    """
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers!r}")
+    max_batch_bytes = max_worker_memory // PARTIAL_INDEX_OVERHEAD if max_worker_memory else None
+    max_batch_files = max(1, -(-len(file_paths) // (workers * BATCHES_PER_WORKER)))
+    batches = []
+    batch = []
+    batch_bytes = 0
+    for file_path in file_paths:
+        size = os.path.getsize(file_path)
+        if batch and (len(batch) == max_batch_files or
+                      (max_batch_bytes is not None and batch_bytes + size > max_batch_bytes)):
+            batches.append(batch)
+            batch = []
+            batch_bytes = 0
+        batch.append(file_path)
+        batch_bytes += size
+    if batch:
+        batches.append(batch)
+    return batches
@@ -0,0 +1,22 @@
+"""Memoizing methods per instance without keeping the instance alive."""
+import weakref
+from functools import lru_cache
+
+
+def cached_method(method, maxsize=128):
+    """
+    An lru_cache around a bound method, to be stored on the method's own instance.
+
+    lru_cache(maxsize)(self.method) stored on self is a reference cycle (instance, cache,
+    bound method, instance), so the instance and everything cached stay in memory until
+    the garbage collector runs. This wrapper reaches the instance through a weak
+    reference instead. It keeps cache_info() and cache_clear().
+    """
+    instance = weakref.ref(method.__self__)
+    function = method.__func__
+
+    @lru_cache(maxsize=maxsize)
+    def cached(*args, **kwargs):
+        return function(instance(), *args, **kwargs)
+
+    return cached
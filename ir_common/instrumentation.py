@@ -0,0 +1,100 @@
+"""Opt-in stage timers and counters for the retrieval hot paths.
+
+The models wrap their hot paths in ``stage("tokenize")``, ``stage("expand")``,
+``stage("score")`` and ``stage("sort")``, and bump counters with ``count()``.
+Nothing is recorded until instrumentation is enabled; while it is off, both calls
+return immediately.
+
+    with instrumented() as stats:
+        engine.rank("information retrieval")
+    print(stats.report())
+"""
+import time
+from contextlib import contextmanager, nullcontext
+
+_NO_STAGE = nullcontext()
+
+# The active Instrumentation, or None while instrumentation is off
+_active = None
+
+
+class Instrumentation:
+    """Accumulated wall time and call count per stage, plus named counters."""
+
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block under the given stage name."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            total, calls = self.timers.get(name, (0.0, 0))
+            self.timers[name] = (total + elapsed, calls + 1)
+
+    def count(self, name, amount=1):
+        """Add amount to a named counter."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        """Drop everything recorded so far."""
+        self.timers.clear()
+        self.counters.clear()
+
+    def report(self):
+        """Plain-data summary: seconds and calls per stage, and the counters."""
+        return {
+            "stages": {name: {"seconds": total, "calls": calls}
+                       for name, (total, calls) in sorted(self.timers.items())},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+
+def enable(instrumentation=None):
+    """Start recording into instrumentation (a new one by default) and return it."""
+    global _active
+    _active = instrumentation if instrumentation is not None else Instrumentation()
+    return _active
+
+
+def disable():
+    """Stop recording, returning the Instrumentation that was active (if any)."""
+    global _active
+    previous, _active = _active, None
+    return previous
+
+
+def active():
+    """The Instrumentation currently recording, or None."""
+    return _active
+
+
+@contextmanager
+def instrumented(instrumentation=None):
+    """Record stages and counters for the duration of the block."""
+    previous = _active
+    current = enable(instrumentation)
+    try:
+        yield current
+    finally:
+        if previous is not None:
+            enable(previous)
+        else:
+            disable()
+
+
+def stage(name):
+    """Context manager timing a stage while instrumentation is on; a no-op otherwise."""
+    if _active is None:
+        return _NO_STAGE
+    return _active.stage(name)
+
+
+def count(name, amount=1):
+    """Bump a counter while instrumentation is on."""
+    if _active is not None:
+        _active.count(name, amount)
@@ -0,0 +1,23 @@
+"""Top-k selection over arrays of document scores."""
+import numpy as np
+
+
+def top_k(scores, k=None, doc_indices=None):
+    """
+    The k highest (document index, score) pairs, highest first and ties in document order.
+
+    scores is a 1-D array, one score per entry of doc_indices (0 .. len(scores) - 1 by
+    default); all entries are ranked when k is None. Only the entries tied with or above
+    the k-th best score are sorted.
+    """
+    num_scores = len(scores)
+    if doc_indices is None:
+        doc_indices = np.arange(num_scores)
+    k = num_scores if k is None else min(k, num_scores)
+    if 0 < k < num_scores:
+        # Partial sort: keep everything tied with or above the k-th best score
+        kth_score = np.partition(scores, num_scores - k)[num_scores - k]
+        top = scores >= kth_score
+        doc_indices, scores = doc_indices[top], scores[top]
+    order = np.lexsort((doc_indices, -scores))[:max(k, 0)]
+    return [(int(doc_indices[i]), float(scores[i])) for i in order]
@@ -0,0 +1,72 @@
+"""Fixtures loading the assignments' modules and notebooks the way the benchmarks do."""
+import os
+import sys
+import types
+
+import pytest
+
+from benchmarks.run_benchmarks import load_module, load_notebook
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def repo_path(*parts):
+    return os.path.join(REPO_ROOT, *parts)
+
+
+@pytest.fixture(scope="session")
+def week_01():
+    namespace = load_notebook(repo_path("Assignment 01", "week_01.ipynb"))
+    # Registered as a module so that process pool workers can unpickle its functions
+    module = types.ModuleType(namespace["__name__"])
+    module.__dict__.update(namespace)
+    sys.modules[module.__name__] = module
+    return namespace
+
+
+@pytest.fixture(scope="session")
+def week_02(tmp_path_factory):
+    module = load_module(repo_path("Assignment 02", "week_02.py"), "week_02")
+    # Registered so that process pool workers can unpickle its functions
+    sys.modules["week_02"] = module
+    # Snapshots written by default go to a temporary cache, not the user's
+    module.SNAPSHOT_DIRECTORY = str(tmp_path_factory.mktemp("snapshots"))
+    return module
+
+
+@pytest.fixture(scope="session")
+def week_05():
+    return load_notebook(repo_path("Assignment_05", "week_05.ipynb"))
+
+
+@pytest.fixture(scope="session")
+def week_03():
+    return load_notebook(repo_path("Assignment_03", "week_03.ipynb"))
+
+
+@pytest.fixture(scope="session")
+def assignment_06():
+    module = load_module(repo_path("Assignment_06", "assignment_06.py"), "assignment_06")
+    # Registered so that process pool workers can unpickle its functions
+    sys.modules["assignment_06"] = module
+    return module
+
+
+@pytest.fixture(scope="session")
+def belief_model():
+    return load_module(repo_path("Assignment_07", "belief_model.py"), "belief_model")
+
+
+@pytest.fixture(scope="session")
+def inference_model():
+    return load_module(repo_path("Assignment_07", "inference_model.py"), "inference_model")
+
+
+@pytest.fixture(scope="session")
+def week_04_p1():
+    return load_notebook(repo_path("Assignment_04", "week_04_p1.ipynb"))
+
+
+@pytest.fixture(scope="session")
+def week_04_p2():
+    return load_module(repo_path("Assignment_04", "week_04_p2.py"), "week_04_p2")
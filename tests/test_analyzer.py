@@ -0,0 +1,119 @@
+"""Streaming analyzers: equivalence with whole-text tokenization, bounded chunks, sharing."""
+import random
+import re
+import threading
+
+import pytest
+
+from ir_common.analyzer import (SHARED_VOCABULARY, SPLIT, STRIP_PUNCTUATION, WORDS, Analyzer, Vocabulary,
+                                iter_file_chunks, shared_analyzer)
+
+# The tokenizers the modules started out with, applied to the whole text
+REFERENCE_TOKENIZERS = {
+    SPLIT: lambda text: text.lower().split(),
+    WORDS: lambda text: re.findall(r"\b\w+\b", text.lower()),
+    STRIP_PUNCTUATION: lambda text: re.sub(r"[^\w\s]", "", text).lower().split(),
+}
+
+ALPHABET = ["Fox", "the", "dog's", "A", "ÉTÉ", "naïve", "x-y", "42", "!", ".", "日本語"]
+WHITESPACE = [" ", "  ", "\n", "\t", "\r\n", " \f"]
+
+
+def random_text(rng, words=60):
+    pieces = []
+    for _ in range(words):
+        pieces.append(rng.choice(ALPHABET))
+        pieces.append(rng.choice(WHITESPACE) if rng.random() < 0.8 else rng.choice(ALPHABET))
+    return "".join(pieces)
+
+
+def random_chunks(rng, text):
+    chunks = []
+    start = 0
+    while start < len(text):
+        stop = start + rng.randint(1, 12)
+        chunks.append(text[start:stop])
+        start = stop
+    return chunks
+
+
+@pytest.mark.parametrize("mode", sorted(REFERENCE_TOKENIZERS))
+def test_chunked_tokens_match_whole_text(mode):
+    rng = random.Random(mode)
+    analyzer = Analyzer(mode, chunk_size=7)
+    for _ in range(200):
+        text = random_text(rng)
+        expected = REFERENCE_TOKENIZERS[mode](text)
+        assert list(analyzer.iter_tokens(text)) == expected
+        assert list(analyzer.iter_tokens(random_chunks(rng, text))) == expected
+        assert analyzer.analyze(text[:100]) == tuple(REFERENCE_TOKENIZERS[mode](text[:100]))
+
+
+@pytest.mark.parametrize("use_mmap", [True, False])
+def test_file_chunks_decode_across_boundaries(tmp_path, use_mmap):
+    text = random_text(random.Random(1), words=400)
+    path = tmp_path / "corpus.txt"
+    path.write_text(text, encoding="utf-8")
+    chunks = list(iter_file_chunks(str(path), chunk_size=5, use_mmap=use_mmap))
+    assert "".join(chunks) == text
+    assert list(Analyzer(WORDS).iter_tokens(chunks)) == REFERENCE_TOKENIZERS[WORDS](text)
+
+
+def test_empty_and_missing_files(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert list(iter_file_chunks(str(path))) == []
+    with pytest.raises(FileNotFoundError):
+        iter_file_chunks(str(tmp_path / "missing.txt"))
+
+
+def test_runs_without_whitespace_are_cut_at_the_limit():
+    analyzer = Analyzer(SPLIT, max_token_length=10)
+    segments = list(analyzer.iter_segments(["abcdef"] * 5 + [" tail"]))
+    assert all(len(segment) <= 15 for segment in segments)
+    assert "".join(segments) == "abcdef" * 5 + " tail"
+    # Runs shorter than the limit are kept whole
+    assert list(analyzer.iter_tokens(["abc", "def", " ghi"])) == ["abcdef", "ghi"]
+
+
+def test_stopwords_and_term_ids():
+    analyzer = Analyzer(SPLIT, stopwords={"the"})
+    assert list(analyzer.iter_tokens("The fox and the dog")) == ["fox", "and", "dog"]
+    term_ids = list(analyzer.iter_term_ids("fox dog fox"))
+    assert term_ids == [0, 1, 0] and analyzer.vocabulary.terms == ["fox", "dog"]
+    with pytest.raises(ValueError):
+        Analyzer("unknown")
+
+
+def test_short_strings_are_cached():
+    analyzer = Analyzer(SPLIT, max_cached_length=10)
+    analyzer.analyze("a b")
+    analyzer.analyze("a b")
+    analyzer.analyze("a much longer string")
+    info = analyzer.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_vocabulary_interning_is_thread_safe():
+    vocabulary = Vocabulary()
+    terms = [f"t{i}" for i in range(2000)]
+
+    def intern_all():
+        for term in terms:
+            vocabulary.intern(term)
+
+    threads = [threading.Thread(target=intern_all) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(vocabulary.terms) == sorted(terms)
+    assert all(vocabulary.terms[vocabulary.get(term)] == term for term in terms)
+
+
+def test_shared_analyzers_share_one_vocabulary():
+    words = shared_analyzer(WORDS)
+    assert shared_analyzer(WORDS) is words
+    assert shared_analyzer(SPLIT, stopwords=["a"]) is shared_analyzer(SPLIT, stopwords={"a"})
+    assert shared_analyzer(SPLIT) is not shared_analyzer(SPLIT, stopwords={"a"})
+    assert words.vocabulary is shared_analyzer(SPLIT).vocabulary is SHARED_VOCABULARY
@@ -0,0 +1,201 @@
+"""VoiceAssistantNN (Assignment 06): indexed search, query expansion and the batching server."""
+import asyncio
+import gc
+import time
+import weakref
+
+import pytest
+
+DOCUMENTS = [
+    "Regular exercise provides numerous benefits for physical and mental health",
+    "Workouts can improve cardiovascular wellness and overall fitness",
+    "Physical activity is crucial for maintaining good health",
+    "Benefits of consistent training include increased energy",
+    "Gardening tips for spring",
+]
+
+
+@pytest.fixture
+def assistant(assignment_06):
+    return assignment_06.VoiceAssistantNN(DOCUMENTS)
+
+
+def ranking_by_full_vectors(assistant, expanded_query):
+    """Cosine similarity of the query against every document's TF-IDF vector."""
+    query_vector = {token: weight * assistant.inverse_document_frequency(token)
+                    for token, weight in expanded_query.items()}
+    scored = []
+    for doc_index, document in enumerate(assistant.document_corpus):
+        doc_vector = assistant.tf_idf_vectorization(assistant.preprocess_text(document))
+        scored.append((doc_index, assistant.calculate_cosine_similarity(query_vector, doc_vector)))
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return [(assistant.document_corpus[doc_index], score) for doc_index, score in scored]
+
+
+def assert_same_results(actual, expected):
+    assert [document for document, _ in actual] == [document for document, _ in expected]
+    assert [score for _, score in actual] == pytest.approx([score for _, score in expected])
+
+
+@pytest.mark.parametrize("query", ["benefits of exercise", "wellness", "gardening in spring", "nothing matches"])
+def test_search_matches_full_vectors(assistant, query):
+    expanded_query = assistant.semantic_expansion(assistant.preprocess_text(query))
+    assert_same_results(assistant.search_and_retrieve(expanded_query), ranking_by_full_vectors(assistant, expanded_query))
+    assert_same_results(assistant.search_and_retrieve(expanded_query, k=2),
+                        ranking_by_full_vectors(assistant, expanded_query)[:2])
+
+
+def test_updates_invalidate_cached_results(assistant):
+    query = {"gardening": 1.0}
+    before = assistant.search_and_retrieve(query, k=1)
+    index = assistant.add_document("Gardening gardening gardening")
+    assert assistant.search_and_retrieve(query, k=1)[0][0] == "Gardening gardening gardening"
+    assert assistant.remove_document(index) == "Gardening gardening gardening"
+    assert assistant.search_and_retrieve(query, k=1) == before
+    assert assistant.cache_info().hits == 0
+    assert_same_results(assistant.search_and_retrieve(query), ranking_by_full_vectors(assistant, query))
+
+
+def test_repeated_queries_hit_the_cache(assistant):
+    assistant.search_and_retrieve(["health", "exercise"])
+    assistant.search_and_retrieve(["exercise", "health"])
+    assert assistant.cache_info().hits == 1
+
+
+def test_corpus_file_skips_blank_lines(assignment_06, tmp_path):
+    path = tmp_path / "corpus.txt"
+    path.write_text("first document\n\n  second document  \n", encoding="utf-8")
+    assistant = assignment_06.VoiceAssistantNN.from_corpus_file(str(path))
+    assert assistant.document_corpus == ["first document", "second document"]
+
+
+QUERIES = ["benefits of exercise", "wellness and workouts", "gardening", "benefits of exercise"]
+
+
+def test_server_answers_like_process_queries(assignment_06, assistant):
+    results = asyncio.run(assignment_06.serve_queries(QUERIES, k=2, documents=DOCUMENTS, workers=2))
+    expected = assistant.process_queries(QUERIES, k=2)
+    assert [result["status"] for result in results] == ["ok"] * len(QUERIES)
+    assert [result["query"] for result in results] == QUERIES
+    assert [result["results"] for result in results] == [result["results"] for result in expected]
+    assert all(result["latency"] >= 0 for result in results)
+
+
+def test_server_batches_and_groups_by_k(assignment_06):
+    async def run():
+        async with assignment_06.VoiceAssistantServer(DOCUMENTS, workers=1, batch_window=0.05) as server:
+            return await asyncio.gather(server.submit("exercise", k=1), server.submit("exercise", k=3))
+
+    first, second = asyncio.run(run())
+    assert len(first["results"]) == 1 and len(second["results"]) == 3
+    assert first["results"] == second["results"][:1]
+
+
+def test_server_reports_errors_and_timeouts(assignment_06):
+    async def run():
+        async with assignment_06.VoiceAssistantServer(DOCUMENTS, workers=1) as server:
+            # An invalid k fails inside the worker
+            error = await server.submit("exercise", k="two")
+            server.timeout = 0
+            timeout = await server.submit("exercise")
+            return error, timeout
+
+    error, timeout = asyncio.run(run())
+    assert error["status"] == "error" and error["results"] == [] and error["error"]
+    assert timeout["status"] == "timeout" and timeout["results"] == []
+
+
+def slow_process_in_worker(user_queries, k):
+    time.sleep(0.3)
+    return [{"query": user_query, "tokens": [], "expanded_query": {}, "results": []} for user_query in user_queries]
+
+
+def test_stop_answers_every_pending_query(assignment_06, monkeypatch):
+    monkeypatch.setattr(assignment_06, "_process_in_worker", slow_process_in_worker)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        # One batch runs, the next waits for its worker and the rest stay queued
+        server = await assignment_06.VoiceAssistantServer(DOCUMENTS, workers=1, max_batch_size=1, timeout=30).start()
+        submitted = [asyncio.create_task(server.submit(query)) for query in ("a", "b", "c", "d")]
+        await asyncio.sleep(0.1)
+        started = loop.time()
+        await server.stop()
+        results = await asyncio.wait_for(asyncio.gather(*submitted), 5)
+        return results, loop.time() - started, await server.submit("late")
+
+    results, elapsed, late = asyncio.run(run())
+    assert elapsed < 5
+    assert [result["status"] for result in results] == ["error"] * 4
+    assert all("stopped before answering" in result["error"] for result in results)
+    assert late["status"] == "error"
+
+
+def test_main_reports_each_status(assignment_06, monkeypatch, capsys):
+    async def fake_serve_queries(user_queries, k=2, **server_options):
+        return [{"query": "a", "status": "timeout", "results": []},
+                {"query": "b", "status": "error", "error": "boom", "results": []},
+                {"query": "c", "status": "ok", "results": []}]
+
+    monkeypatch.setattr(assignment_06, "serve_queries", fake_serve_queries)
+    assignment_06.main()
+    output = capsys.readouterr().out
+    assert "[timeout] a" in output and "[error] b -> boom" in output and "[ok] c -> no matching documents" in output
+
+
+def test_expansion_weights_decay_from_the_second_hop(assistant):
+    expanded = assistant.semantic_expansion(["workout"])
+    assert expanded["workout"] == 1.0
+    # workout -> exercise -> workouts: direct synonyms keep full weight
+    assert expanded["exercise"] == 1.0 and expanded["workouts"] == 0.5
+    # Query tokens are never down-weighted by an expansion
+    assert assistant.semantic_expansion(["health", "wellness"])["wellness"] == 1.0
+
+
+def test_multi_word_entries_match_in_queries(assignment_06):
+    assistant = assignment_06.VoiceAssistantNN(
+        DOCUMENTS, semantic_knowledge={"physical activity": ["exercise"], "exercise": ["training"]})
+    assert assistant.semantic_expansion(["physical", "activity"]) == {
+        "physical": 1.0, "activity": 1.0, "exercise": 1.0, "training": 0.5}
+    assert "exercise" not in assistant.semantic_expansion(["physical", "health"])
+    depth_one = assignment_06.VoiceAssistantNN(
+        DOCUMENTS, semantic_knowledge={"physical activity": ["exercise"], "exercise": ["training"]},
+        expansion_depth=1)
+    assert "training" not in depth_one.semantic_expansion(["physical", "activity"])
+
+
+def test_semantic_understanding_lists_the_expanded_tokens(assistant):
+    tokens = ["benefits", "of", "exercise"]
+    expanded = assistant.semantic_understanding(tokens)
+    assert isinstance(expanded, list)
+    assert expanded == list(assistant.semantic_expansion(tokens))
+    assert len(set(expanded)) == len(expanded) and {"advantages", "workouts", "fitness"} <= set(expanded)
+
+
+def test_direct_synonyms_rank_as_unweighted_terms(assignment_06):
+    # One hop of expansion gives every term weight 1, as the unweighted token list does
+    assistant = assignment_06.VoiceAssistantNN(DOCUMENTS, expansion_depth=1)
+    for query in ("benefits of exercise", "workout", "wellness"):
+        tokens = assistant.preprocess_text(query)
+        assert set(assistant.semantic_expansion(tokens).values()) == {1.0}
+        assert (assistant.search_and_retrieve(assistant.semantic_expansion(tokens))
+                == assistant.search_and_retrieve(assistant.semantic_understanding(tokens)))
+
+
+def test_expansions_are_cached_per_token_sequence(assistant):
+    first = assistant.semantic_expansion(["benefits", "of", "exercise"])
+    first["benefits"] = 0.0
+    assert assistant.semantic_expansion(["benefits", "of", "exercise"])["benefits"] == 1.0
+    assert assistant._cached_expansion.cache_info().hits == 1
+
+
+def test_assistant_is_freed_without_the_garbage_collector(assignment_06):
+    gc.disable()
+    try:
+        assistant = assignment_06.VoiceAssistantNN(DOCUMENTS)
+        assistant.search_and_retrieve(assistant.semantic_expansion(["exercise"]))
+        reference = weakref.ref(assistant)
+        del assistant
+        assert reference() is None
+    finally:
+        gc.enable()
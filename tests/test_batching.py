@@ -0,0 +1,40 @@
+"""batch_files: contiguous batches for a pool of indexing workers."""
+import pytest
+
+from ir_common.batching import BATCHES_PER_WORKER, PARTIAL_INDEX_OVERHEAD, batch_files
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(10):
+        path = tmp_path / f"{i}.txt"
+        path.write_bytes(b"x" * 100)
+        paths.append(str(path))
+    return paths
+
+
+def test_batches_keep_file_order(files):
+    batches = batch_files(files, workers=2)
+    assert [path for batch in batches for path in batch] == files
+    assert len(batches) <= 2 * BATCHES_PER_WORKER
+
+
+def test_memory_cap_limits_batch_bytes(files):
+    batches = batch_files(files, workers=1, max_worker_memory=250 * PARTIAL_INDEX_OVERHEAD)
+    assert [len(batch) for batch in batches] == [2, 2, 2, 2, 2]
+
+
+def test_oversized_file_gets_its_own_batch(files):
+    batches = batch_files(files, workers=1, max_worker_memory=PARTIAL_INDEX_OVERHEAD)
+    assert batches == [[path] for path in files]
+
+
+def test_no_files_no_batches():
+    assert batch_files([], workers=4) == []
+
+
+@pytest.mark.parametrize("workers", [0, -1])
+def test_rejects_fewer_than_one_worker(files, workers):
+    with pytest.raises(ValueError, match="workers must be at least 1"):
+        batch_files(files, workers)
@@ -0,0 +1,53 @@
+"""BeliefNetwork (Assignment 07): the vectorized query x document posteriors."""
+import random
+
+import pytest
+
+
+def random_network(belief_model, rng, chunk_size=1024):
+    documents = [" ".join("w" for _ in range(rng.randint(1, 9))) for _ in range(rng.randint(1, 12))]
+    queries = [f"q{i}" for i in range(rng.randint(0, 7))]
+    judgments = {(rng.choice(queries), rng.randint(-1, len(documents))): rng.randint(0, 1)
+                 for _ in range(rng.randint(0, 10)) if queries}
+    return belief_model.BeliefNetwork(documents, queries, judgments, chunk_size=chunk_size)
+
+
+def test_matrices_match_the_scalar_formulas(belief_model):
+    rng = random.Random(1)
+    for _ in range(50):
+        network = random_network(belief_model, rng, chunk_size=rng.randint(1, 4))
+        relevance, joint = network.compute_probability_matrices()
+        assert joint.shape == relevance.shape == (len(network.queries), len(network.documents))
+        for row, query in enumerate(network.queries):
+            for doc_index in range(len(network.documents)):
+                assert relevance[row, doc_index] == pytest.approx(network.compute_bayes_relevance(query, doc_index))
+                assert joint[row, doc_index] == pytest.approx(network.compute_joint_probability(query, doc_index))
+
+
+def test_rankings_sort_the_joint_probabilities(belief_model):
+    rng = random.Random(2)
+    for _ in range(50):
+        network = random_network(belief_model, rng)
+        _, joint = network.compute_probability_matrices()
+        k = rng.choice([None, 1, 3])
+        for row, ranking in enumerate(network.rank_documents(k, chunk_size=2)):
+            expected = sorted(enumerate(joint[row].tolist()), key=lambda pair: (-pair[1], pair[0]))
+            assert ranking == expected[:k]
+
+
+def test_chunk_size_does_not_change_results(belief_model):
+    network = random_network(belief_model, random.Random(3))
+    assert network.rank_documents(chunk_size=1) == network.rank_documents(chunk_size=100)
+
+
+def test_no_queries(belief_model):
+    network = belief_model.BeliefNetwork(["a b"], [], {})
+    relevance, joint = network.compute_probability_matrices()
+    assert relevance.shape == joint.shape == (0, 1)
+    assert network.rank_documents() == []
+
+
+def test_evaluation_prints_the_top_k(belief_model, capsys):
+    belief_model.BeliefNetwork().evaluate_model(k=2)
+    output = capsys.readouterr().out
+    assert output.count("Query: ") == 3 and output.count("Rank 1:") == 3 and "Rank 3:" not in output
@@ -0,0 +1,44 @@
+"""The benchmark suite: synthetic data, the per-model harness and baseline comparison."""
+import json
+
+import pytest
+
+from benchmarks import run_benchmarks
+
+
+def test_synthetic_data_is_reproducible():
+    assert run_benchmarks.synthetic_corpus(20, vocab_size=500, seed=3) == \
+        run_benchmarks.synthetic_corpus(20, vocab_size=500, seed=3)
+    assert run_benchmarks.synthetic_queries(10, vocab_size=500, seed=3) != \
+        run_benchmarks.synthetic_queries(10, vocab_size=500, seed=4)
+
+
+@pytest.mark.parametrize("model", sorted(run_benchmarks.MODELS))
+def test_every_model_runs_instrumented(model):
+    report = run_benchmarks.run_benchmarks([30], [model], num_queries=5, k=3, measure_memory=False,
+                                           instrument=True, vocab_size=300, progress=None)
+    (result,) = report["results"]
+    assert (result["model"], result["documents"], result["queries"]) == (model, 30, 5)
+    assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+    assert "stages" in result and "counters" in result
+
+
+def test_compare_flags_regressions():
+    baseline = {"results": [{"model": "tfidf", "documents": 10, "qps": 100.0, "p50_ms": 1.0}]}
+    current = {"results": [{"model": "tfidf", "documents": 10, "qps": 70.0, "p50_ms": 1.1},
+                           {"model": "dice", "documents": 10, "qps": 5.0, "p50_ms": 1.0}]}
+    rows = {row[2]: row for row in run_benchmarks.compare_results(baseline, current, threshold=0.2)}
+    assert rows["qps"][-1] is True
+    assert rows["p50_ms"][-1] is False
+    assert all(row[0] == "tfidf" for row in rows.values())
+
+
+def test_main_writes_and_compares_results(tmp_path, capsys):
+    output = tmp_path / "results.json"
+    arguments = ["--sizes", "20", "--models", "tfidf", "--queries", "3", "--no-memory",
+                 "--vocab-size", "200", "--output", str(output)]
+    assert run_benchmarks.main(arguments) == 0
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert report["meta"]["sizes"] == [20]
+    assert run_benchmarks.main(arguments + ["--compare", str(output), "--threshold", "1000"]) == 0
+    assert "Compared with" in capsys.readouterr().out
@@ -0,0 +1,37 @@
+"""cached_method: per-instance memoization without reference cycles."""
+import gc
+import weakref
+
+from ir_common.caching import cached_method
+
+
+class Squares:
+    def __init__(self):
+        self.calls = 0
+        self.cached_square = cached_method(self.square, maxsize=2)
+
+    def square(self, value):
+        self.calls += 1
+        return value * value
+
+
+def test_results_are_memoized():
+    squares = Squares()
+    assert [squares.cached_square(value) for value in (3, 3, 4)] == [9, 9, 16]
+    assert squares.calls == 2
+    info = squares.cached_square.cache_info()
+    assert (info.hits, info.misses, info.maxsize) == (1, 2, 2)
+    squares.cached_square.cache_clear()
+    assert squares.cached_square(3) == 9 and squares.calls == 3
+
+
+def test_instance_is_freed_without_the_garbage_collector():
+    gc.disable()
+    try:
+        squares = Squares()
+        squares.cached_square(5)
+        reference = weakref.ref(squares)
+        del squares
+        assert reference() is None
+    finally:
+        gc.enable()
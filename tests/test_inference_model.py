@@ -0,0 +1,65 @@
+"""InterferenceModel (Assignment 07): qrels streaming and indexed judgments."""
+import types
+
+import pytest
+
+DOCUMENTS = ["doc zero", "doc one", "doc two", "doc three"]
+QUERIES = ["q1", "q2"]
+
+
+def write_qrels(tmp_path, content):
+    path = tmp_path / "judgments.qrels"
+    path.write_text(content, encoding="utf-8")
+    return str(path)
+
+
+def test_read_qrels_formats(inference_model, tmp_path):
+    path = write_qrels(tmp_path, "q1 0 2 1\n\nq1 3 0\nq2 0 1 2\nq2 1 -1\n")
+    judgments = inference_model.read_qrels(path)
+    assert isinstance(judgments, types.GeneratorType)
+    assert list(judgments) == [("q1", 2, 1), ("q1", 3, 0), ("q2", 1, 1), ("q2", 1, 0)]
+
+
+def test_read_qrels_maps_document_ids(inference_model, tmp_path):
+    path = write_qrels(tmp_path, "q1 0 DOC-B 1\nq1 0 DOC-X 1\nq2 0 DOC-A 0\n")
+    judgments = inference_model.read_qrels(path, doc_ids={"DOC-A": 0, "DOC-B": 1})
+    assert list(judgments) == [("q1", 1, 1), ("q2", 0, 0)]
+
+
+@pytest.mark.parametrize("line", ["q1 1\n", "q1 0 2 1 extra\n"])
+def test_read_qrels_rejects_malformed_lines(inference_model, tmp_path, line):
+    path = write_qrels(tmp_path, "q1 0 2 1\n" + line)
+    with pytest.raises(ValueError, match=":2:"):
+        list(inference_model.read_qrels(path))
+
+
+def test_qrels_file_matches_judgment_dict(inference_model, tmp_path):
+    path = write_qrels(tmp_path, "q1 0 0 1\nq1 0 2 0\nq2 0 1 1\nq3 0 3 1\n")
+    from_file = inference_model.InterferenceModel(DOCUMENTS, QUERIES, qrels_path=path)
+    from_dict = inference_model.InterferenceModel(
+        DOCUMENTS, QUERIES, {("q1", 0): 1, ("q1", 2): 0, ("q2", 1): 1, ("q3", 3): 1})
+    for query in QUERIES + ["q3", "unknown"]:
+        assert from_file.retrieve_documents(query) == from_dict.retrieve_documents(query)
+
+
+def test_repeated_judgment_keeps_the_last_label(inference_model, tmp_path):
+    path = write_qrels(tmp_path, "q1 0 2 0\n")
+    model = inference_model.InterferenceModel(DOCUMENTS, QUERIES, {("q1", 2): 1}, qrels_path=path)
+    assert model.compute_relevance("q1", 2) == 0
+
+
+def test_retrieval_agrees_with_compute_relevance(inference_model):
+    model = inference_model.InterferenceModel(
+        DOCUMENTS, QUERIES, {("q1", 0): 1, ("q1", 2): 0, ("q2", 1): 1, ("q2", 9): 1, ("q9", 3): 1})
+    for query in QUERIES + ["q9", "unknown"]:
+        expected = sorted(((doc_index, model.compute_relevance(query, doc_index))
+                           for doc_index in range(len(DOCUMENTS))), key=lambda pair: (-pair[1], pair[0]))
+        ranked = model.retrieve_documents(query)
+        assert [doc_index for doc_index, _ in ranked] == [doc_index for doc_index, _ in expected]
+        assert [score for _, score in ranked] == pytest.approx([score for _, score in expected])
+        assert model.retrieve_documents(query, k=2) == ranked[:2]
+
+
+def test_no_judgments(inference_model):
+    model = inference_model.InterferenceModel(DOCUMENTS, QUERIES, {})
+    assert model.retrieve_documents("q1") == [(doc_index, 0.0) for doc_index in range(len(DOCUMENTS))]
@@ -0,0 +1,37 @@
+"""Opt-in stage timers and counters."""
+from ir_common import instrumentation
+
+
+def test_off_by_default():
+    assert instrumentation.active() is None
+    with instrumentation.stage("score"):
+        instrumentation.count("candidates")
+    assert instrumentation.active() is None
+
+
+def test_instrumented_records_stages_and_counters():
+    with instrumentation.instrumented() as stats:
+        for _ in range(3):
+            with instrumentation.stage("score"):
+                instrumentation.count("candidates", 2)
+    report = stats.report()
+    assert report["stages"]["score"]["calls"] == 3
+    assert report["stages"]["score"]["seconds"] >= 0
+    assert report["counters"] == {"candidates": 6}
+    assert instrumentation.active() is None
+
+
+def test_nested_blocks_restore_the_outer_recorder():
+    with instrumentation.instrumented() as outer:
+        with instrumentation.instrumented() as inner:
+            instrumentation.count("inner")
+        instrumentation.count("outer")
+    assert inner.counters == {"inner": 1} and outer.counters == {"outer": 1}
+
+
+def test_reset_drops_everything():
+    stats = instrumentation.Instrumentation()
+    with stats.stage("sort"):
+        stats.count("candidates")
+    stats.reset()
+    assert stats.report() == {"stages": {}, "counters": {}}
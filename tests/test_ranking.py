@@ -0,0 +1,41 @@
+"""top_k: partial top-k selection over score arrays."""
+import numpy as np
+import pytest
+
+from ir_common.ranking import top_k
+
+
+def reference(scores, k, doc_indices):
+    ranked = sorted(zip(doc_indices, scores), key=lambda pair: (-pair[1], pair[0]))
+    return [(int(i), float(score)) for i, score in ranked][:k]
+
+
+def test_highest_first_ties_in_document_order():
+    scores = np.array([0.5, 0.9, 0.5, 0.1, 0.9])
+    assert top_k(scores, 3) == [(1, 0.9), (4, 0.9), (0, 0.5)]
+    assert top_k(scores) == [(1, 0.9), (4, 0.9), (0, 0.5), (2, 0.5), (3, 0.1)]
+
+
+def test_doc_indices_label_the_scores():
+    scores = np.array([0.2, 0.7, 0.7])
+    assert top_k(scores, 2, np.array([9, 5, 3])) == [(3, 0.7), (5, 0.7)]
+
+
+@pytest.mark.parametrize("k", [0, -1])
+def test_non_positive_k_selects_nothing(k):
+    assert top_k(np.array([0.3, 0.1]), k) == []
+
+
+def test_empty_scores():
+    assert top_k(np.array([]), 5) == []
+
+
+def test_matches_a_full_sort():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        size = int(rng.integers(1, 40))
+        # Few distinct values, so the k-th score is often tied
+        scores = rng.integers(0, 5, size).astype(np.float64)
+        doc_indices = rng.permutation(100)[:size]
+        k = int(rng.integers(1, size + 3))
+        assert top_k(scores, k, doc_indices) == reference(scores, k, doc_indices)
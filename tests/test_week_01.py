@@ -0,0 +1,311 @@
+"""InvertedIndex (Assignment 01): on-disk segments, updates and deletes."""
+import os
+import threading
+import time
+
+import pytest
+
+
+DOCUMENTS = {
+    "Foxes": "The quick brown fox jumps over the lazy dog. A fox is quick.",
+    "Dogs": "A lazy dog sleeps all day while the fox runs.",
+    "Space": "Space exploration sends probes to distant planets.",
+}
+
+
+@pytest.fixture
+def docs_dir(tmp_path):
+    directory = tmp_path / "docs"
+    directory.mkdir()
+    for title, text in DOCUMENTS.items():
+        (directory / f"{title}.txt").write_text(text, encoding="utf-8")
+    return str(directory)
+
+
+@pytest.fixture
+def index(week_01, docs_dir):
+    index = week_01["InvertedIndex"]()
+    index.add_documents_from_directory(docs_dir)
+    return index
+
+
+def test_flushed_segment_answers_like_the_memory_index(index, tmp_path):
+    expected = {word: index.search(word) for word in ("fox", "dog", "space", "planets", "missing")}
+    index.flush(str(tmp_path / "flushed.seg"))
+    assert index.index == {} and index.forward_index == {}
+    assert {word: index.search(word) for word in expected} == expected
+
+
+def test_segment_reopens_in_a_fresh_index(week_01, index, tmp_path):
+    path = str(tmp_path / "saved.seg")
+    index.save_segment(path)
+    reopened = week_01["InvertedIndex"]()
+    reopened.open_segment(path)
+    assert reopened.search("fox") == index.search("fox") == {"Foxes": 2, "Dogs": 1}
+    assert reopened.search_document_by_title("Space") == DOCUMENTS["Space"]
+
+
+def test_segment_stores_sorted_terms_and_doc_freqs(week_01, index, tmp_path):
+    path = str(tmp_path / "saved.seg")
+    index.save_segment(path)
+    with week_01["IndexSegment"](path) as segment:
+        terms = list(segment.terms())
+        assert terms == sorted(index.index)
+        assert all(segment.doc_freq(term) == len(index.index[term]) for term in terms)
+        assert segment.doc_freq("missing") == 0
+
+
+def test_merge_combines_segments(index, tmp_path):
+    index.flush(str(tmp_path / "first.seg"))
+    index.create_indexer(100, "Extra", "A fox in space.")
+    index.flush(str(tmp_path / "second.seg"))
+    expected = index.search("fox")
+    merged = index.merge_segments(str(tmp_path / "merged.seg"))
+    assert index.segments == [merged]
+    assert index.search("fox") == expected == {"Foxes": 2, "Dogs": 1, "Extra": 1}
+
+
+def test_background_merge_returns_the_thread(index, tmp_path):
+    index.flush(str(tmp_path / "first.seg"))
+    index.merge_segments(str(tmp_path / "merged.seg"), background=True).join()
+    assert [segment.path for segment in index.segments] == [str(tmp_path / "merged.seg")]
+    assert index.search("dog") == {"Foxes": 1, "Dogs": 1}
+
+
+def test_replaced_segments_stay_open_while_a_search_reads_them(index, tmp_path):
+    index.flush(str(tmp_path / "first.seg"))
+    index.create_indexer(100, "Extra", "A fox in space.")
+    index.flush(str(tmp_path / "second.seg"))
+    with index._pinned_segments() as pinned:
+        merged = index.merge_segments(str(tmp_path / "merged.seg"))
+        assert index.segments == [merged]
+        assert sum(count for segment, _ in pinned for _, count in segment.postings("fox")) == 4
+    assert all(segment._buffer.closed for segment, _ in pinned)
+    assert not merged._buffer.closed
+    assert index.search("fox") == {"Foxes": 2, "Dogs": 1, "Extra": 1}
+
+
+def test_overlapping_background_merges_run_one_at_a_time(week_01, index, tmp_path, monkeypatch):
+    index.flush(str(tmp_path / "first.seg"))
+    index.create_indexer(100, "Extra", "A fox in space.")
+    index.flush(str(tmp_path / "second.seg"))
+    write_segment = week_01["write_segment"]
+    events = []
+
+    def slow_write_segment(path, *args, **kwargs):
+        events.append(("start", path))
+        time.sleep(0.05)
+        write_segment(path, *args, **kwargs)
+        events.append(("end", path))
+
+    monkeypatch.setitem(week_01, "write_segment", slow_write_segment)
+    errors = []
+    monkeypatch.setattr(threading, "excepthook", errors.append)
+    threads = [index.merge_segments(str(tmp_path / f"merged{i}.seg"), background=True) for i in range(2)]
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert [kind for kind, _ in events] == ["start", "end", "start", "end"]
+    assert len(index.segments) == 1 and len(index.tombstones) == 1
+    assert index.search("fox") == {"Foxes": 2, "Dogs": 1, "Extra": 1}
+
+
+def test_searches_during_merges_see_every_document(index, tmp_path):
+    index.flush(str(tmp_path / "first.seg"))
+    expected = index.search("fox")
+    failures = []
+    done = threading.Event()
+
+    def search_until_done():
+        while not done.is_set():
+            try:
+                if index.search("fox") != expected:
+                    failures.append("wrong result")
+            except Exception as error:
+                failures.append(error)
+
+    searchers = [threading.Thread(target=search_until_done) for _ in range(3)]
+    for searcher in searchers:
+        searcher.start()
+    for i in range(20):
+        index.merge_segments(str(tmp_path / f"merged{i % 2}.seg"))
+    done.set()
+    for searcher in searchers:
+        searcher.join()
+    assert failures == []
+
+
+def test_doc_ids_are_dense_and_stable(week_01, index, docs_dir):
+    assert sorted(index.doc_ids_by_path.values()) == [0, 1, 2]
+    doc_id = index.title_index["space"]
+    index.add_documents_from_directory(docs_dir)
+    assert index.title_index["space"] == doc_id
+    assert index.next_doc_id == 3
+
+
+def test_delete_from_a_segment_is_a_tombstone(index, tmp_path):
+    segment = index.flush(str(tmp_path / "flushed.seg"))
+    doc_id = index.title_index["foxes"]
+    index.remove_document(doc_id)
+    assert index.tombstones[segment] == {doc_id}
+    assert index.search("fox") == {"Dogs": 1}
+    assert index.search_document_by_title("Foxes") == "Document with title 'Foxes' not found."
+
+
+def test_merge_drops_tombstoned_documents(index, tmp_path):
+    index.flush(str(tmp_path / "flushed.seg"))
+    index.remove_document(index.title_index["foxes"])
+    merged = index.merge_segments(str(tmp_path / "merged.seg"))
+    assert index.tombstones[merged] == set()
+    assert [title for _, _, title, _ in merged.docs()] == ["Dogs", "Space"]
+    assert index.search("fox") == {"Dogs": 1}
+
+
+def test_update_supersedes_the_segment_copy(index, tmp_path):
+    segment = index.flush(str(tmp_path / "flushed.seg"))
+    doc_id = index.title_index["dogs"]
+    index.create_indexer(doc_id, "Dogs", "Dogs chase cats.")
+    assert doc_id in index.tombstones[segment]
+    assert index.search("fox") == {"Foxes": 2}
+    assert index.search("cats") == {"Dogs": 1}
+
+
+def test_text_without_a_path_survives_flush_and_merge(week_01, tmp_path):
+    index = week_01["InvertedIndex"]()
+    index.create_indexer(0, "Note", "Text that only lives in the index.")
+    index.flush(str(tmp_path / "flushed.seg"))
+    assert index.search_document_by_title("Note") == "Text that only lives in the index."
+    index.merge_segments(str(tmp_path / "merged.seg"))
+    assert index.search_document_by_title("Note") == "Text that only lives in the index."
+
+
+def test_flush_over_an_open_segment_keeps_it_readable(index, tmp_path):
+    path = str(tmp_path / "segment.seg")
+    index.flush(path)
+    index.create_indexer(100, "Extra", "A fox in space.")
+    index.flush(path)
+    assert not os.path.exists(path + ".tmp")
+    assert index.search("fox") == {"Foxes": 2, "Dogs": 1, "Extra": 1}
+    assert index.search("planets") == {"Space": 1}
+
+
+def test_merge_into_an_open_segment_path(index, tmp_path):
+    first = str(tmp_path / "first.seg")
+    index.flush(first)
+    index.create_indexer(100, "Extra", "A fox in space.")
+    index.flush(str(tmp_path / "second.seg"))
+    expected = {word: index.search(word) for word in ("fox", "space", "planets")}
+    merged = index.merge_segments(first)
+    assert index.segments == [merged]
+    assert {word: index.search(word) for word in expected} == expected
+
+
+@pytest.fixture
+def opened_files(week_01, monkeypatch):
+    files = []
+
+    def recording_open(*args, **kwargs):
+        files.append(open(*args, **kwargs))
+        return files[-1]
+
+    monkeypatch.setitem(week_01, "open", recording_open)
+    return files
+
+
+@pytest.mark.parametrize("content", [b"", b"IIXS", "truncated"])
+def test_unreadable_segment_is_rejected_and_closed(week_01, index, tmp_path, opened_files, content):
+    path = tmp_path / "bad.seg"
+    if content == "truncated":
+        index.save_segment(str(path))
+        content = path.read_bytes()[:-10]
+    path.write_bytes(content)
+    del opened_files[:]
+    with pytest.raises(ValueError, match="is not a version"):
+        week_01["IndexSegment"](str(path))
+    assert len(opened_files) == 1 and opened_files[0].closed
+
+
+@pytest.mark.parametrize("workers", [0, -2])
+def test_rejects_fewer_than_one_worker(week_01, docs_dir, workers):
+    with pytest.raises(ValueError, match="workers must be at least 1"):
+        week_01["InvertedIndex"]().add_documents_from_directory(docs_dir, workers=workers)
+
+
+@pytest.mark.parametrize("positional", [False, True])
+def test_process_pool_build_matches_a_serial_build(week_01, tmp_path, positional):
+    directory = tmp_path / "many"
+    directory.mkdir()
+    for i in range(30):
+        words = " ".join(f"word{(i * j) % 23}" for j in range(1, 15))
+        (directory / f"doc{i:02}.txt").write_text(f"The fox and {words}.", encoding="utf-8")
+    serial = week_01["InvertedIndex"](positional)
+    serial.add_documents_from_directory(str(directory))
+    parallel = week_01["InvertedIndex"](positional)
+    progress = []
+    parallel.add_documents_from_directory(str(directory), workers=3,
+                                          progress=lambda done, total: progress.append((done, total)))
+    assert len(progress) > 1 and progress[-1] == (30, 30)
+    for name in ("index", "positions", "forward_index", "document_titles", "doc_ids_by_path", "title_index"):
+        assert getattr(parallel, name) == getattr(serial, name)
+    assert parallel.search("word5") == serial.search("word5")
+    if positional:
+        assert parallel.search_phrase("fox word1") == serial.search_phrase("fox word1")
+
+
+def test_partial_index_merge_matches_a_serial_build(week_01, index, docs_dir):
+    # The merge a parallel build runs for each worker's batch, without the process pool
+    file_paths = sorted(os.path.join(docs_dir, name) for name in os.listdir(docs_dir))
+    merged = week_01["InvertedIndex"]()
+    for batch in (file_paths[:1], file_paths[1:]):
+        merged._merge_partial_index(*week_01["_index_file_batch"](batch, merged.stopwords))
+    assert merged.index == index.index
+    assert merged.forward_index == index.forward_index
+    assert merged.document_titles == index.document_titles
+
+
+@pytest.fixture
+def positional_index(week_01, docs_dir):
+    index = week_01["InvertedIndex"](positional=True)
+    index.add_documents_from_directory(docs_dir)
+    return index
+
+
+def test_phrase_counts_occurrences(positional_index):
+    assert positional_index.search_phrase("lazy dog") == {"Foxes": 1, "Dogs": 1}
+    assert positional_index.search_phrase("quick brown fox") == {"Foxes": 1}
+    assert positional_index.search_phrase("dog lazy") == {}
+
+
+def test_phrase_keeps_stopword_gaps(positional_index):
+    # "jumps over the lazy": "the" is a stopword but still takes a position
+    assert positional_index.search_phrase("over the lazy") == {"Foxes": 1}
+    assert positional_index.search_phrase("over lazy") == {}
+
+
+def test_near_counts_hits_within_the_distance(positional_index):
+    assert positional_index.search_near("fox NEAR/6 dog") == {"Foxes": 2, "Dogs": 1}
+    assert positional_index.search_near("fox NEAR/2 dog") == {"Foxes": 1}
+    assert positional_index.search_near("fox NEAR/1 dog") == {}
+    with pytest.raises(ValueError):
+        positional_index.search_near("fox near dog")
+
+
+def test_near_with_the_same_word_needs_two_occurrences(positional_index):
+    # Foxes has "fox" at word offsets 3 and 10, Dogs has a single "fox"
+    assert positional_index.search_near("fox NEAR/7 fox") == {"Foxes": 2}
+    assert positional_index.search_near("fox NEAR/6 fox") == {}
+    assert positional_index.search_near("space NEAR/5 space") == {}
+    assert positional_index.search_near("fox NEAR/0 fox") == {}
+
+
+def test_positions_survive_flush_and_merge(positional_index, tmp_path):
+    expected = positional_index.search_phrase("lazy dog")
+    positional_index.flush(str(tmp_path / "flushed.seg"))
+    assert positional_index.search_phrase("lazy dog") == expected
+    positional_index.merge_segments(str(tmp_path / "merged.seg"))
+    assert positional_index.search_phrase("lazy dog") == expected
+
+
+def test_phrase_needs_a_positional_index(index):
+    with pytest.raises(ValueError, match="positional=True"):
+        index.search_phrase("lazy dog")
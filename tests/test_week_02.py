@@ -0,0 +1,348 @@
+"""TfidfSearchEngine (Assignment 02): index loading, updates and ranking."""
+import os
+import pickle
+import random
+
+import pytest
+
+
+def write_corpus(directory, count):
+    directory.mkdir()
+    for i in range(count):
+        words = " ".join(f"term{(i * j) % 37}" for j in range(1, 12))
+        (directory / f"doc{i:03}.txt").write_text(f"Document {i}: {words}.", encoding="utf-8")
+    return str(directory)
+
+
+def engine_state(engine):
+    return engine.titles, engine.doc_tfs, engine.doc_freqs, engine.idfs, engine.tfidf_docs
+
+
+def test_parallel_load_matches_a_serial_load(week_02, tmp_path):
+    directory = write_corpus(tmp_path / "docs", week_02.PARALLEL_MIN_FILES + 6)
+    serial, serial_documents, serial_paths = week_02.load_index(
+        directory, snapshot_path=str(tmp_path / "serial.pkl"))
+    progress = []
+    parallel, parallel_documents, parallel_paths = week_02.load_index(
+        directory, snapshot_path=str(tmp_path / "parallel.pkl"), workers=3,
+        progress=lambda done, total: progress.append((done, total)))
+    assert parallel_paths == serial_paths
+    assert parallel_documents == serial_documents
+    assert engine_state(parallel) == engine_state(serial)
+    assert len(progress) > 1 and progress[-1] == (len(serial_paths), len(serial_paths))
+    assert parallel.rank("term5 term7", 5) == serial.rank("term5 term7", 5)
+
+
+@pytest.mark.parametrize("workers", [0, -1])
+def test_load_rejects_fewer_than_one_worker(week_02, tmp_path, workers):
+    directory = write_corpus(tmp_path / "docs", 2)
+    with pytest.raises(ValueError, match="workers must be at least 1"):
+        week_02.load_index(directory, snapshot_path=str(tmp_path / "index.pkl"), workers=workers)
+
+
+CORPUS = [
+    "solar energy from solar panels",
+    "wind energy and wind turbines",
+    "energy storage for solar and wind",
+    "the history of the printing press",
+    "panels of experts discuss energy policy",
+    "wind",
+    "the history of solar power",
+]
+
+
+@pytest.fixture
+def engine(week_02):
+    tokenized = [week_02.preprocess(text) for text in CORPUS]
+    return week_02.TfidfSearchEngine(tokenized, [f"doc{i}" for i in range(len(CORPUS))])
+
+
+def brute_force_ranking(week_02, documents, query, k=None):
+    """Cosine similarity of the query against every document's full TF-IDF vector."""
+    tokenized = [week_02.preprocess(text) for text in documents]
+    idfs = week_02.compute_idf(tokenized)
+    query_vector = week_02.compute_tfidf(week_02.compute_tf(week_02.preprocess(query)), idfs)
+    query_norm = sum(value ** 2 for value in query_vector.values()) ** 0.5
+    scores = []
+    for i, tokens in enumerate(tokenized):
+        doc_vector = week_02.compute_tfidf(week_02.compute_tf(tokens), idfs)
+        doc_norm = sum(value ** 2 for value in doc_vector.values()) ** 0.5
+        dot_product = sum(weight * doc_vector.get(term, 0) for term, weight in query_vector.items())
+        if dot_product:
+            scores.append((i, dot_product / (query_norm * doc_norm)))
+    scores.sort(key=lambda x: (-x[1], x[0]))
+    return scores if k is None else scores[:k]
+
+
+def assert_same_ranking(actual, expected):
+    assert [i for i, _ in actual] == [i for i, _ in expected]
+    assert [score for _, score in actual] == pytest.approx([score for _, score in expected], rel=1e-12)
+
+
+@pytest.mark.parametrize("query", ["solar energy", "wind", "history of printing", "energy energy panels", "unknown"])
+@pytest.mark.parametrize("k", [None, 1, 3])
+def test_rank_matches_brute_force_cosine(week_02, engine, query, k):
+    assert_same_ranking(engine.rank(query, k), brute_force_ranking(week_02, CORPUS, query, k))
+
+
+def test_ties_are_broken_by_document_index(week_02):
+    tokenized = [week_02.preprocess(text) for text in ["red apple", "green pear", "red apple", "red apple"]]
+    engine = week_02.TfidfSearchEngine(tokenized, ["a", "b", "c", "d"])
+    assert [i for i, _ in engine.rank("apple", 2)] == [0, 2]
+    assert [i for i, _ in engine.rank("apple")] == [0, 2, 3]
+
+
+def test_terms_in_every_document_do_not_score(week_02):
+    engine = week_02.TfidfSearchEngine([["common", "rare"], ["common"]], ["a", "b"])
+    assert engine.rank("common") == []
+    assert [i for i, _ in engine.rank("common rare")] == [0]
+
+
+def test_rank_batch_matches_rank(engine):
+    queries = ["solar energy", "wind", "history of printing", "unknown", "", "energy panels wind"]
+    for query, ranking in zip(queries, engine.rank_batch(queries, k=3, batch_size=4)):
+        assert_same_ranking(ranking, engine.rank(query, 3))
+
+
+def test_rank_batch_builds_the_matrix_after_updates(week_02, engine):
+    engine.rank_batch(["solar"], k=3)
+    engine.add_document("doc7", week_02.preprocess("solar solar solar"))
+    assert_same_ranking(engine.rank_batch(["solar"], k=3)[0], engine.rank("solar", 3))
+
+
+def random_engine(week_02, rng, num_docs):
+    words = [f"w{i}" for i in range(30)]
+    documents = [" ".join(rng.choice(words[:rng.randint(2, 30)]) for _ in range(rng.randint(1, 20)))
+                 for _ in range(num_docs)]
+    engine = week_02.TfidfSearchEngine([week_02.preprocess(text) for text in documents],
+                                       [str(i) for i in range(num_docs)])
+    return engine, words
+
+
+def test_maxscore_matches_exhaustive_ranking(week_02):
+    rng = random.Random(7)
+    for _ in range(40):
+        engine, words = random_engine(week_02, rng, rng.randint(1, 60))
+        for _ in range(10):
+            query = " ".join(rng.sample(words, rng.randint(1, 5)))
+            for k in (1, 2, 5, 20):
+                assert engine.rank_maxscore(query, k) == engine.rank(query, k)
+
+
+def test_module_pruning_flag_uses_maxscore(week_02, engine, monkeypatch):
+    monkeypatch.setattr(week_02, "_engine", engine)
+    assert week_02.rank_documents("solar energy", 2, pruning=True) == engine.rank("solar energy", 2)
+    assert engine.rank_maxscore("solar energy", 0) == []
+
+
+
+def test_incremental_updates_match_a_rebuild(week_02):
+    rng = random.Random(11)
+    words = [f"w{i}" for i in range(15)]
+    for _ in range(30):
+        documents = []
+        engine = week_02.TfidfSearchEngine()
+        for step in range(20):
+            if documents and rng.random() < 0.4:
+                i = rng.randrange(len(documents))
+                del documents[i]
+                engine.remove_document(i)
+            if rng.random() < 0.7:
+                tokens = [rng.choice(words[:rng.randint(1, 15)]) for _ in range(rng.randint(1, 8))]
+                documents.append((f"t{step}", tokens))
+                assert engine.add_document(f"t{step}", tokens) == len(documents) - 1
+            rebuilt = week_02.TfidfSearchEngine([tokens for _, tokens in documents],
+                                                [title for title, _ in documents])
+            assert engine.titles == rebuilt.titles
+            query = " ".join(rng.sample(words, 3))
+            assert engine.rank(query) == rebuilt.rank(query)
+            assert engine.rank_maxscore(query, 3) == rebuilt.rank(query, 3)
+        assert engine.idfs == rebuilt.idfs
+        assert engine.tfidf_docs == rebuilt.tfidf_docs
+
+
+def test_merge_partial_matches_adding_documents(week_02):
+    tokenized = [week_02.preprocess(text) for text in CORPUS]
+    engine = week_02.TfidfSearchEngine(tokenized[:2], ["doc0", "doc1"])
+    engine.rank("solar")
+    titles, doc_tfs, doc_freqs = [], [], week_02.Counter()
+    for i, tokens in enumerate(tokenized[2:], start=2):
+        titles.append(f"doc{i}")
+        doc_tfs.append(week_02.compute_tf(tokens))
+        doc_freqs.update(doc_tfs[-1].keys())
+    engine.merge_partial(titles, doc_tfs, doc_freqs)
+    rebuilt = week_02.TfidfSearchEngine(tokenized, [f"doc{i}" for i in range(len(CORPUS))])
+    assert engine.rank("solar energy") == rebuilt.rank("solar energy")
+    assert engine.doc_freqs == rebuilt.doc_freqs
+
+
+@pytest.fixture
+def module_index(week_02, tmp_path, monkeypatch):
+    directory = write_corpus(tmp_path / "docs", 4)
+    monkeypatch.setattr(week_02, "directory_path", directory)
+    monkeypatch.setattr(week_02, "document_titles", {})
+    for name in ("_engine", "_documents", "_file_paths"):
+        monkeypatch.setattr(week_02, name, None)
+    week_02.get_engine()
+    return directory
+
+
+def test_module_updates_keep_titles_and_snapshot_consistent(week_02, module_index):
+    snapshot_path = week_02.default_snapshot_path(module_index)
+    assert os.path.exists(snapshot_path)
+    assert sorted(week_02.document_titles.values()) == ["doc000", "doc001", "doc002", "doc003"]
+
+    doc_index = week_02.add_document("Extra", "solar panels")
+    assert week_02.document_titles[hash("Extra")] == "Extra"
+    assert not os.path.exists(snapshot_path)
+    assert [i for i, _ in week_02.rank_documents("solar")] == [doc_index]
+
+    file_path, title = week_02._file_paths[0], week_02.get_engine().titles[0]
+    week_02.remove_document(0)
+    assert hash(file_path) not in week_02.document_titles
+    assert sorted(week_02.document_titles.values()) == sorted(week_02.get_engine().titles)
+    assert title not in week_02.get_engine().titles and len(week_02.documents) == 4
+
+
+def test_engine_loads_in_process_unless_asked(week_02, tmp_path, monkeypatch):
+    directory = write_corpus(tmp_path / "docs", week_02.PARALLEL_MIN_FILES)
+    monkeypatch.setattr(week_02, "directory_path", directory)
+    monkeypatch.setattr(week_02, "document_titles", {})
+    for name in ("_engine", "_documents", "_file_paths"):
+        monkeypatch.setattr(week_02, name, None)
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("a process pool was started")
+
+    monkeypatch.setattr(week_02, "ProcessPoolExecutor", no_pool)
+    assert len(week_02.get_engine().titles) == week_02.PARALLEL_MIN_FILES
+
+
+def count_preprocess_calls(week_02, monkeypatch):
+    calls = []
+    preprocess = week_02.preprocess
+
+    def counting_preprocess(text):
+        calls.append(text)
+        return preprocess(text)
+
+    monkeypatch.setattr(week_02, "preprocess", counting_preprocess)
+    return calls
+
+
+def test_unchanged_snapshot_is_reused(week_02, tmp_path, monkeypatch):
+    directory = write_corpus(tmp_path / "docs", 5)
+    snapshot_path = str(tmp_path / "index.pkl")
+    engine, _, _ = week_02.load_index(directory, snapshot_path)
+    calls = count_preprocess_calls(week_02, monkeypatch)
+    reloaded, _, _ = week_02.load_index(directory, snapshot_path)
+    assert calls == []
+    assert reloaded.rank("term3 term9") == engine.rank("term3 term9")
+
+
+def test_snapshot_reindexes_only_changed_files(week_02, tmp_path, monkeypatch):
+    directory = write_corpus(tmp_path / "docs", 5)
+    snapshot_path = str(tmp_path / "index.pkl")
+    week_02.load_index(directory, snapshot_path)
+    os.remove(os.path.join(directory, "doc001.txt"))
+    with open(os.path.join(directory, "doc002.txt"), "a", encoding="utf-8") as file:
+        file.write(" changed")
+    calls = count_preprocess_calls(week_02, monkeypatch)
+    engine, documents, file_paths = week_02.load_index(directory, snapshot_path)
+    assert len(calls) == 1 and calls[0].endswith("changed")
+    assert sorted(engine.titles) == ["doc000", "doc002", "doc003", "doc004"]
+
+    fresh, _, _ = week_02.load_index(directory, str(tmp_path / "fresh.pkl"))
+    for query in ("changed", "term4 term8"):
+        ranking = {engine.titles[i]: score for i, score in engine.rank(query)}
+        assert ranking == pytest.approx({fresh.titles[i]: score for i, score in fresh.rank(query)})
+
+
+def test_unreadable_snapshot_is_rebuilt(week_02, tmp_path):
+    directory = write_corpus(tmp_path / "docs", 3)
+    snapshot_path = tmp_path / "index.pkl"
+    snapshot_path.write_bytes(b"not a pickle")
+    engine, documents, _ = week_02.load_index(directory, str(snapshot_path))
+    assert len(engine.titles) == len(documents) == 3
+
+
+def test_default_snapshot_is_kept_out_of_the_corpus(week_02, tmp_path):
+    directory = write_corpus(tmp_path / "docs", 3)
+    week_02.load_index(directory)
+    snapshot_path = week_02.default_snapshot_path(directory)
+    assert os.path.exists(snapshot_path)
+    assert os.path.dirname(snapshot_path) == week_02.SNAPSHOT_DIRECTORY
+    assert sorted(os.listdir(directory)) == ["doc000.txt", "doc001.txt", "doc002.txt"]
+
+
+class PlantedPayload:
+    def __init__(self, marker):
+        self.marker = marker
+
+    def __reduce__(self):
+        return os.mkdir, (self.marker,)
+
+
+def test_snapshot_naming_other_objects_is_not_loaded(week_02, tmp_path):
+    directory = write_corpus(tmp_path / "docs", 3)
+    snapshot_path = str(tmp_path / "index.pkl")
+    week_02.load_index(directory, snapshot_path)
+    with open(snapshot_path, "rb") as file:
+        snapshot = pickle.load(file)
+    marker = str(tmp_path / "payload_ran")
+    snapshot["engine"]["titles"] = PlantedPayload(marker)
+    with open(snapshot_path, "wb") as file:
+        pickle.dump(snapshot, file)
+    engine, documents, _ = week_02.load_index(directory, snapshot_path)
+    assert not os.path.exists(marker)
+    assert sorted(engine.titles) == ["doc000", "doc001", "doc002"] and len(documents) == 3
+
+
+@pytest.mark.parametrize("snapshot", [["not", "a", "dict"], {"version": 1}, {"version": "any", "engine": {}}])
+def test_snapshot_of_another_shape_or_version_is_rebuilt(week_02, tmp_path, snapshot):
+    directory = write_corpus(tmp_path / "docs", 3)
+    snapshot_path = tmp_path / "index.pkl"
+    snapshot_path.write_bytes(pickle.dumps(snapshot))
+    engine, documents, _ = week_02.load_index(directory, str(snapshot_path))
+    assert len(engine.titles) == len(documents) == 3
+
+
+def test_loading_leaves_the_matrix_to_the_first_batch_query(week_02, tmp_path):
+    directory = write_corpus(tmp_path / "docs", 5)
+    snapshot_path = str(tmp_path / "index.pkl")
+    engine, _, _ = week_02.load_index(directory, snapshot_path)
+    assert engine.doc_matrix is None
+    expected = engine.rank("term3 term9", 3)
+    [ranking] = engine.rank_batch(["term3 term9"], 3)
+    assert [i for i, _ in ranking] == [i for i, _ in expected]
+    assert [score for _, score in ranking] == pytest.approx([score for _, score in expected])
+    assert engine.doc_matrix is not None
+    reloaded, _, _ = week_02.load_index(directory, snapshot_path)
+    assert reloaded.doc_matrix is None
+
+
+def test_cache_normalizes_word_order(engine):
+    engine.rank("solar energy", 3)
+    engine.rank("energy   SOLAR", 3)
+    info = engine.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_cache_is_invalidated_by_updates(week_02, engine):
+    before = engine.rank("solar", 3)
+    engine.add_document("doc7", week_02.preprocess("solar solar solar"))
+    after = engine.rank("solar", 3)
+    assert after != before and after[0][0] == len(CORPUS)
+    engine.remove_document(len(CORPUS))
+    assert engine.rank("solar", 3) == before
+    assert engine.cache_info().hits == 0
+
+
+def test_cache_evicts_least_recently_used(week_02):
+    engine = week_02.TfidfSearchEngine([["a", "b"], ["b", "c"]], ["x", "y"], cache_size=2)
+    for query in ("a", "c", "a", "b"):
+        engine.rank(query)
+    info = engine.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 3, 2)
+    engine.rank("c")
+    assert engine.cache_info().misses == 4
@@ -0,0 +1,212 @@
+"""Assignment 03: Dice retrieval, posting-list algebra and graph retrieval."""
+import random
+
+import numpy as np
+import pytest
+
+DOCUMENTS = [
+    "The quick brown fox",
+    "A fox and a dog on the hill",
+    "Dogs chase the quick cat",
+    "Information retrieval of the documents",
+    "the the the",
+]
+
+
+def dense_dice_ranking(week_03, documents, query, K):
+    """The original pipeline: binary vectors over the vocabulary and scipy's Dice distance."""
+    doc_vectors, vocab = week_03["term_weighting"](documents)
+    query_vector = week_03["query_representation"](query, vocab)
+    ranked = week_03["rank_documents"](query_vector, doc_vectors)
+    return week_03["retrieve_top_k_documents"](ranked, K)
+
+
+@pytest.mark.parametrize("query", ["quick fox", "dog hill fox", "retrieval", "the cat", "fox fox quick"])
+@pytest.mark.parametrize("K", [1, 3, 5])
+def test_dice_matches_dense_vectors(week_03, query, K):
+    model = week_03["DiceRetrievalModel"](DOCUMENTS)
+    expected = dense_dice_ranking(week_03, DOCUMENTS, query, K)
+    ranked = model.top_k(query, K)
+    assert [doc_index for doc_index, _ in ranked] == [doc_index for doc_index, _ in expected]
+    assert [score for _, score in ranked] == pytest.approx([score for _, score in expected])
+
+
+def test_dice_random_collections(week_03):
+    rng = random.Random(2)
+    words = [f"w{i}" for i in range(12)]
+    for _ in range(100):
+        documents = [" ".join(rng.choices(words, k=rng.randint(1, 6))) for _ in range(rng.randint(1, 10))]
+        query = " ".join(rng.choices(words, k=rng.randint(1, 4)))
+        model = week_03["DiceRetrievalModel"](documents)
+        if not model.query_term_ids(query):
+            continue
+        ranked = model.top_k(query, 4)
+        expected = dense_dice_ranking(week_03, documents, query, 4)
+        assert [doc_index for doc_index, _ in ranked] == [doc_index for doc_index, _ in expected]
+        assert [score for _, score in ranked] == pytest.approx([score for _, score in expected])
+
+
+def test_dice_batch_and_wrapper(week_03):
+    model = week_03["DiceRetrievalModel"](DOCUMENTS)
+    queries = ["quick fox", "retrieval", "quick fox"]
+    assert model.top_k_batch(queries, K=2) == [model.top_k(query, 2) for query in queries]
+    assert week_03["binary_independence_model"](DOCUMENTS, "quick fox", K=2) == model.top_k("quick fox", 2)
+
+
+def test_dice_unknown_query_scores_zero(week_03):
+    model = week_03["DiceRetrievalModel"](DOCUMENTS)
+    assert model.top_k("unknown words", K=2) == [(0, 0.0), (1, 0.0)]
+
+
+def random_posting_lists(week_03, rng):
+    PostingList = week_03["PostingList"]
+    universe = rng.randint(1, 200)
+    first = sorted(rng.sample(range(universe), rng.randint(0, universe)))
+    second = sorted(rng.sample(range(universe), rng.randint(0, min(universe, rng.choice([3, universe])))))
+    return PostingList(first), PostingList(second)
+
+
+def test_posting_list_set_operations(week_03):
+    rng = random.Random(4)
+    for _ in range(500):
+        first, second = random_posting_lists(week_03, rng)
+        first_set, second_set = set(first), set(second)
+        for result, expected in ((first.union(second), first_set | second_set),
+                                 (first.intersection(second), first_set & second_set),
+                                 (first.difference(second), first_set - second_set),
+                                 (second.difference(first), second_set - first_set)):
+            assert list(result) == sorted(expected)
+
+
+def test_posting_list_membership(week_03):
+    posting_list = week_03["PostingList"]([1, 4, 9])
+    assert 4 in posting_list and 5 not in posting_list and 10 not in posting_list
+    assert len(posting_list) == 3
+    assert repr(posting_list) == "PostingList([1, 4, 9])"
+
+
+@pytest.mark.parametrize("doc_id", [9, 3])
+def test_posting_list_rejects_unsorted_appends(week_03, doc_id):
+    posting_list = week_03["PostingList"]([1, 4, 9])
+    with pytest.raises(ValueError, match="increasing order"):
+        posting_list.append(doc_id)
+
+
+def test_posting_list_iterators_are_lazy(week_03):
+    PostingList = week_03["PostingList"]
+    first, second = PostingList(range(0, 100, 2)), PostingList(range(0, 100, 3))
+    intersection = first.iter_intersection(second)
+    assert next(intersection) == 0 and next(intersection) == 6
+    assert list(week_03["iter_union"]([], [1, 2])) == [1, 2]
+    assert list(week_03["iter_difference"]([1, 2], [])) == [1, 2]
+
+
+def make_graph(week_03, edges, nodes=()):
+    graph = week_03["Graph"]()
+    for node in nodes:
+        graph.add_node(node)
+    for edge in edges:
+        for node in edge[:2]:
+            graph.add_node(node)
+        graph.add_edge(*edge)
+    return graph
+
+
+def pagerank_by_dense_iteration(graph, proximal_nodes, alpha=0.85, iterations=300):
+    """Power iteration on a dense transition matrix; dangling walks restart at the seeds."""
+    num_nodes = len(graph.nodes)
+    graph._build()
+    weights = np.zeros((num_nodes, num_nodes))
+    weights[graph._rows, graph.indices] = graph.weights
+    restart = np.zeros(num_nodes)
+    restart[[graph.node_ids[node] for node in proximal_nodes]] = 1 / len(proximal_nodes)
+    out_weights = weights.sum(axis=1)
+    scores = restart.copy()
+    for _ in range(iterations):
+        spread = np.zeros(num_nodes)
+        for i in range(num_nodes):
+            if out_weights[i]:
+                spread += scores[i] * weights[i] / out_weights[i]
+            else:
+                spread += scores[i] * restart
+        scores = alpha * spread + (1 - alpha) * restart
+    return scores
+
+
+def test_edges_are_undirected_and_replace_weights(week_03):
+    graph = make_graph(week_03, [("a", "b", 1.0), ("b", "c", 2.0), ("a", "b", 5.0)], nodes=["d"])
+    assert sorted(graph.get_connected_nodes("b")) == ["a", "c"]
+    assert graph.get_connected_nodes("d") == [] and graph.get_connected_nodes("missing") == []
+    graph._build()
+    a, b = graph.node_ids["a"], graph.node_ids["b"]
+    assert graph.weights[graph.indptr[a]:graph.indptr[a + 1]].tolist() == [5.0]
+    assert sorted(graph.weights[graph.indptr[b]:graph.indptr[b + 1]].tolist()) == [2.0, 5.0]
+
+
+def test_nodes_within_depth(week_03):
+    graph = make_graph(week_03, [("a", "b"), ("b", "c"), ("c", "d"), ("x", "y")])
+    assert graph.get_nodes_within(["a"]) == {"b"}
+    assert graph.get_nodes_within(["a"], depth=2) == {"b", "c"}
+    assert graph.get_nodes_within(["a", "b"]) == {"a", "b", "c"}
+    assert graph.get_nodes_within(["a", "x"], depth=3) == {"b", "c", "d", "y"}
+    assert week_03["retrieve_documents"](graph, ["missing"]) == set()
+
+
+def test_pagerank_matches_dense_iteration(week_03):
+    rng = random.Random(8)
+    for _ in range(20):
+        nodes = [f"n{i}" for i in range(rng.randint(2, 12))]
+        edges = [(rng.choice(nodes), rng.choice(nodes), rng.choice([0.0, 0.5, 1.0, 3.0]))
+                 for _ in range(rng.randint(0, 20))]
+        graph = make_graph(week_03, edges, nodes=nodes)
+        seeds = rng.sample(nodes, rng.randint(1, 2))
+        scores = graph.personalized_pagerank(seeds, tol=1e-14, max_iter=1000)
+        assert scores.sum() == pytest.approx(1.0)
+        assert scores == pytest.approx(pagerank_by_dense_iteration(graph, seeds), abs=1e-9)
+
+
+def test_zero_weight_edges_pass_nothing_on(week_03):
+    graph = make_graph(week_03, [("a", "b", 1.0), ("b", "c", 0.0)])
+    scores = graph.personalized_pagerank(["c"])
+    assert not np.isnan(scores).any()
+    assert scores[graph.node_ids["c"]] == pytest.approx(1.0)
+
+
+def test_rank_nodes_breaks_ties_by_node_id(week_03):
+    graph = make_graph(week_03, [("hub", "z"), ("hub", "y"), ("hub", "x")])
+    ranked = graph.rank_nodes(["hub"], k=2)
+    assert [node for node, _ in ranked] == ["z", "y"]
+    assert ranked[0][1] == ranked[1][1]
+    assert graph.rank_nodes(["missing"]) == []
+
+
+def test_pagerank_cache_follows_graph_changes(week_03):
+    graph = make_graph(week_03, [("a", "b")])
+    before = graph.personalized_pagerank(["a"])
+    assert graph.personalized_pagerank(["a"]) is before
+    graph.add_node("c")
+    graph.add_edge("a", "c")
+    after = graph.personalized_pagerank(["a"])
+    assert after[graph.node_ids["c"]] > 0 and len(after) == 3
+
+
+def test_edge_list_loading(week_03, tmp_path):
+    path = tmp_path / "edges.tsv"
+    path.write_text("# comment\nb\ta\t2.5\n\na\tc\t1\n", encoding="utf-8")
+    graph = week_03["Graph"].from_edge_list(str(path))
+    expected = make_graph(week_03, [("b", "a", 2.5), ("a", "c", 1.0)])
+    assert graph.nodes == expected.nodes == ["b", "a", "c"]
+    assert graph.personalized_pagerank(["a"]).tolist() == expected.personalized_pagerank(["a"]).tolist()
+
+    path.write_text("x\ty\n", encoding="utf-8")
+    assert week_03["Graph"].from_edge_list(str(path)).get_connected_nodes("x") == ["y"]
+    path.write_text("", encoding="utf-8")
+    assert week_03["Graph"].from_edge_list(str(path)).nodes == []
+
+
+@pytest.mark.parametrize("content", ["a\tb\t1\nc\td\n", "a\n", "a\tb\t1\t2\n", "a\tb\theavy\n"])
+def test_edge_list_rejects_malformed_lines(week_03, tmp_path, content):
+    path = tmp_path / "edges.tsv"
+    path.write_text(content, encoding="utf-8")
+    with pytest.raises(ValueError):
+        week_03["Graph"].from_edge_list(str(path))
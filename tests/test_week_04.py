@@ -0,0 +1,125 @@
+"""Assignment 04: the flattened content hierarchy and the e-book's link paths."""
+import json
+from collections import deque
+
+import pytest
+
+HIERARCHY = {
+    "Science": {
+        "Physics": {"Quantum Mechanics": ["Wave Functions", "Quantum Tunneling"], "Optics": ["Lenses"]},
+        "Biology": {"Genetics": ["DNA Replication", "Gene Expression"]},
+    },
+    "Technology": {
+        "Software": {"Web Development": ["Node.js", "React Basics"], "Databases": ["SQL Basics"]},
+        "Hardware": ["Quantum Computers", "Processors"],
+    },
+}
+
+
+@pytest.fixture
+def table(week_04_p1):
+    return week_04_p1["ContentHierarchy"](HIERARCHY)
+
+
+@pytest.fixture
+def lazy_table(week_04_p1, tmp_path):
+    week_04_p1["save_subtrees"](HIERARCHY, str(tmp_path / "hierarchy"), depth=1)
+    return week_04_p1["ContentHierarchy"].from_directory(str(tmp_path / "hierarchy"))
+
+
+def test_nodes_are_numbered_in_preorder(table):
+    assert table.names[:4] == ["Science", "Physics", "Quantum Mechanics", "Wave Functions"]
+    science, technology = table.roots
+    assert table.subtree_ends[science] == technology == 11
+    assert table.is_ancestor(science, table.node_at(("Science", "Biology", "Genetics")))
+    assert not table.is_ancestor(technology, table.node_at(("Science", "Physics")))
+    assert table.path_of(table.node_at(("Technology", "Hardware", "Processors"))) == (
+        "Technology", "Hardware", "Processors")
+    assert table.is_item[table.node_at(("Technology", "Hardware", "Processors"))]
+    assert table.holds_items[table.node_at(("Technology", "Hardware"))]
+    with pytest.raises(KeyError):
+        table.node_at(("Science", "Chemistry"))
+
+
+def test_search_and_prefix_search(table):
+    assert [table.names[node] for node in table.search("quantum")] == [
+        "Quantum Mechanics", "Quantum Tunneling", "Quantum Computers"]
+    assert [table.names[node] for node in table.search("QUANTUM computers")] == ["Quantum Computers"]
+    assert [table.names[node] for node in table.search("js")] == ["Node.js"]
+    assert table.search("") == [] and table.search("chemistry") == []
+    assert [table.names[node] for node in table.search_prefix("gen")] == [
+        "Genetics", "Gene Expression"]
+
+
+def test_lazy_table_loads_only_what_it_needs(table, lazy_table):
+    assert len(lazy_table.subtree_files) == 4
+    assert lazy_table.search("tunneling") == table.search("tunneling")
+    assert len(lazy_table.subtree_files) == 3
+    assert lazy_table.search("tunneling") == table.search("tunneling")
+    assert lazy_table.search_prefix("proc") == table.search_prefix("proc")
+    assert len(lazy_table.subtree_files) == 2
+
+
+def test_lazy_table_matches_the_eager_one(table, lazy_table):
+    for query in ("quantum", "basics", "react basics", "missing"):
+        assert lazy_table.search(query) == table.search(query)
+    for prefix in ("q", "ba", "z"):
+        assert lazy_table.search_prefix(prefix) == table.search_prefix(prefix)
+    lazy_table.load_all()
+    assert not lazy_table.subtree_files
+    assert lazy_table.names == table.names
+    assert lazy_table.parents == table.parents and lazy_table.subtree_ends == table.subtree_ends
+
+
+def test_lazy_navigation(table, lazy_table):
+    path = ("Technology", "Software", "Databases", "SQL Basics")
+    assert lazy_table.node_at(path) == table.node_at(path)
+    software = lazy_table.node_at(path[:2])
+    assert [lazy_table.names[node] for node in lazy_table.children_of(software)] == ["Web Development", "Databases"]
+    assert list(lazy_table.iter_preorder()) == list(range(len(table.names)))
+
+
+def test_subtree_size_mismatch_is_reported(week_04_p1, tmp_path):
+    directory = tmp_path / "hierarchy"
+    week_04_p1["save_subtrees"](HIERARCHY, str(directory), depth=0)
+    (directory / "subtree_000000.json").write_text(json.dumps({"Only": []}), encoding="utf-8")
+    lazy_table = week_04_p1["ContentHierarchy"].from_directory(str(directory))
+    with pytest.raises(ValueError, match="does not match"):
+        lazy_table.load_all()
+
+
+def shortest_distances(book, source):
+    distances = {source: 0}
+    queue = deque([source])
+    while queue:
+        chapter_id = queue.popleft()
+        for link in book[chapter_id]["links"]:
+            if link not in distances:
+                distances[link] = distances[chapter_id] + 1
+                queue.append(link)
+    return distances
+
+
+def test_shortest_link_paths(week_04_p2, monkeypatch):
+    book = {1: {"links": [2, 3]}, 2: {"links": [4]}, 3: {"links": [4, 5]}, 4: {"links": [5]},
+            5: {"links": []}, 6: {"links": [1]}}
+    monkeypatch.setattr(week_04_p2, "chapters", book)
+    for source in book:
+        distances = shortest_distances(book, source)
+        for target in book:
+            path = week_04_p2.shortest_link_path(source, target)
+            if target not in distances:
+                assert path is None
+                continue
+            assert path[0] == source and path[-1] == target and len(path) - 1 == distances[target]
+            assert all(link in book[chapter_id]["links"] for chapter_id, link in zip(path, path[1:]))
+
+
+def test_load_chapters_checks_links(week_04_p2, tmp_path):
+    path = tmp_path / "book.json"
+    path.write_text(json.dumps({"1": {"title": "A", "content": "", "links": [2]},
+                                "2": {"title": "B", "content": "", "links": []}}), encoding="utf-8")
+    assert sorted(week_04_p2.load_chapters(str(path))) == [1, 2]
+    path.write_text(json.dumps({"1": {"title": "A", "content": "", "links": [7]}}), encoding="utf-8")
+    with pytest.raises(ValueError, match="missing chapter 7"):
+        week_04_p2.load_chapters(str(path))
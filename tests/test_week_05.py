@@ -0,0 +1,177 @@
+"""BooleanExtendedIRModel (Assignment 05): bitmaps, the query compiler and p-norm ranking."""
+import random
+
+import pytest
+
+DOCUMENTS = [
+    "algorithm optimization sorting",
+    "algorithm dynamic graph theory",
+    "graph theory network analysis",
+    "sorting networks",
+    "dynamic optimization",
+]
+
+
+@pytest.fixture
+def model(week_05):
+    return week_05["BooleanExtendedIRModel"](DOCUMENTS, verbose=False)
+
+
+def documents(model, bitmap):
+    return list(model.iter_documents(bitmap))
+
+
+def test_term_bitmaps_follow_postings(model):
+    assert documents(model, model.get_term_vector("algorithm")) == [0, 1]
+    assert documents(model, model.get_term_vector("graph")) == [1, 2]
+    assert model.get_term_vector("missing") == 0
+
+
+def test_bitmap_round_trip(week_05):
+    model_class = week_05["BooleanExtendedIRModel"]
+    doc_indices = [0, 3, 7, 8, 64, 65, 1000]
+    assert list(model_class.iter_documents(model_class._postings_to_bitmap(doc_indices))) == doc_indices
+    assert model_class._postings_to_bitmap([]) == 0
+    assert list(model_class.iter_documents(0)) == []
+
+
+def test_bitmap_operations(model):
+    algorithm, graph = model.get_term_vector("algorithm"), model.get_term_vector("graph")
+    assert documents(model, model.and_operation(algorithm, graph)) == [1]
+    assert documents(model, model.or_operation(algorithm, graph)) == [0, 1, 2]
+    assert documents(model, model.difference_operation(algorithm, graph)) == [0]
+    # NOT stays within the collection
+    assert documents(model, model.not_operation(algorithm)) == [2, 3, 4]
+
+
+def test_term_document_matrix(model):
+    matrix = model.create_term_document_matrix()
+    assert len(matrix) == len(DOCUMENTS)
+    for doc_index, row in enumerate(matrix):
+        terms = {term for term, present in zip(model.vocab, row) if present}
+        assert terms == set(DOCUMENTS[doc_index].split())
+
+
+def test_parse_precedence_and_grouping(model):
+    assert model.parse_query("a OR b AND NOT c") == (
+        "or", [("term", "a"), ("and", [("term", "b"), ("not", ("term", "c"))])])
+    assert model.parse_query("(a OR b) c") == (
+        "and", [("or", [("term", "a"), ("term", "b")]), ("term", "c")])
+    assert model.parse_query("a OR (b OR c)") == (
+        "or", [("term", "a"), ("or", [("term", "b"), ("term", "c")])])
+    assert model.parse_query("NOT NOT a") == ("not", ("not", ("term", "a")))
+    assert model.parse_query("  ") == ("or", [])
+
+
+@pytest.mark.parametrize("query", ["a AND", "(a OR b", "a)", "OR a", "a AND OR b", "()"])
+def test_malformed_queries_raise(model, query):
+    with pytest.raises(ValueError):
+        model.parse_query(query)
+
+
+def test_plan_flattens_and_orders_by_size(model):
+    plan = model.compile_query("algorithm AND (sorting AND NOT graph) AND networks")
+    kind, estimate, positives, negatives = plan
+    assert (kind, estimate) == ("and", 1)
+    assert [term for _, _, term in positives] == ["networks", "algorithm", "sorting"]
+    assert [term for _, _, term in negatives] == ["graph"]
+    assert model.compile_query("NOT NOT graph") == ("term", 2, "graph")
+
+
+def evaluate_by_sets(node, documents):
+    """Reference evaluation of a parse tree with Python sets."""
+    kind = node[0]
+    if kind == "term":
+        return {i for i, document in enumerate(documents) if node[1] in document.split()}
+    if kind == "not":
+        return set(range(len(documents))) - evaluate_by_sets(node[1], documents)
+    results = [evaluate_by_sets(child, documents) for child in node[1]]
+    if kind == "or":
+        return set().union(*results)
+    return set.intersection(*results)
+
+
+def random_query(rng, terms, depth=0):
+    roll = rng.random()
+    if depth > 2 or roll < 0.4:
+        return rng.choice(terms)
+    if roll < 0.55:
+        return "NOT " + random_query(rng, terms, depth + 1)
+    operator = rng.choice([" AND ", " OR ", " "])
+    query = operator.join(random_query(rng, terms, depth + 1) for _ in range(rng.randint(2, 3)))
+    return f"({query})" if rng.random() < 0.5 else query
+
+
+def test_evaluation_matches_set_semantics(model):
+    rng = random.Random(5)
+    terms = sorted(model.vocab) + ["missing"]
+    for _ in range(500):
+        query = random_query(rng, terms)
+        expected = evaluate_by_sets(model.parse_query(query), DOCUMENTS)
+        assert set(documents(model, model.process_query(query))) == expected, query
+
+
+def test_and_stops_at_an_empty_result(model, monkeypatch):
+    plan = model.compile_query("missing AND algorithm AND graph")
+    evaluated = []
+    evaluate_plan = model.evaluate_plan
+
+    def tracing_evaluate_plan(plan):
+        evaluated.append(plan)
+        return evaluate_plan(plan)
+
+    monkeypatch.setattr(model, "evaluate_plan", tracing_evaluate_plan)
+    assert model.evaluate_plan(plan) == 0
+    assert [node[2] for node in evaluated[1:]] == ["missing"]
+
+
+def test_compiled_plans_are_cached(model):
+    model.process_query("algorithm AND graph")
+    model.process_query("algorithm AND graph")
+    assert model._compiled_plans.cache_info().hits == 1
+
+
+def pnorm_by_brute_force(model, query, k, p):
+    """Score every document with the p-norm formulas on the query's parse tree."""
+    tree = model.parse_query(query)
+    max_weight = max(model.term_weights.values(), default=1.0)
+    scored = []
+    for doc_index, document in enumerate(model.documents):
+        terms = set(document.split())
+        score = model._pnorm_score(
+            tree, lambda term: model.term_weights[term] / max_weight if term in terms else 0.0, p)
+        if score > 0:
+            scored.append((doc_index, score))
+    scored.sort(key=lambda doc: (-doc[1], doc[0]))
+    return scored[:k]
+
+
+@pytest.mark.parametrize("p", [1.0, 2.0, 5.0])
+def test_pnorm_matches_brute_force(model, p):
+    rng = random.Random(int(p))
+    terms = sorted(model.vocab) + ["missing"]
+    for _ in range(200):
+        query = random_query(rng, terms)
+        k = rng.randint(1, 6)
+        ranked = [(doc_index, score) for doc_index, _, score in model.rank_pnorm(query, k, p)]
+        expected = pnorm_by_brute_force(model, query, k, p)
+        assert [doc_index for doc_index, _ in ranked] == [doc_index for doc_index, _ in expected], query
+        assert [score for _, score in ranked] == pytest.approx([score for _, score in expected])
+
+
+def test_pnorm_keeps_nested_operators(model):
+    # Flattening "a OR (b OR c)" into one OR would change the score
+    nested = model.rank_pnorm("sorting OR (graph OR dynamic)", k=5)
+    flat = model.rank_pnorm("sorting OR graph OR dynamic", k=5)
+    assert [score for _, _, score in nested] != pytest.approx([score for _, _, score in flat])
+
+
+def test_pnorm_edge_cases(week_05, model):
+    assert model.rank_pnorm("algorithm", k=0) == []
+    assert model.rank_pnorm("", k=3) == []
+    assert model.rank_pnorm("missing", k=3) == []
+    # Every document lacks "missing", so they all share the NOT score
+    assert [doc_index for doc_index, _, _ in model.rank_pnorm("NOT missing", k=3)] == [0, 1, 2]
+    empty = week_05["BooleanExtendedIRModel"](["", ""], verbose=False)
+    assert empty.rank_pnorm("anything", k=3) == []
+    assert [doc_index for doc_index, _, _ in empty.rank_pnorm("NOT anything", k=3)] == [0, 1]